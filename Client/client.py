@@ -1,32 +1,199 @@
+import os
 import sys
+import json
+import glob
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
 
+BULK_PARALLELISM = int(os.getenv('EXPLAINER_CLIENT_PARALLELISM', '4'))
+MANIFEST_NAME = '.upload_manifest.json'
+STREAM_CHUNK_SIZE = 64 * 1024
+# The server stops reporting progress once an upload reaches one of these
+FINAL_STATUSES = ('done', 'partial', 'failed', 'cancelled')
 
-def upload_file(filepath, email=None):
+
+class MultipartStream:
+    """A multipart/form-data body that reads the file from disk as it is sent instead of loading it first."""
+
+    def __init__(self, filepath, fields=None):
+        self.boundary = uuid.uuid4().hex
+        head = b''
+        for name, value in (fields or {}).items():
+            head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                     f'{value}\r\n').encode('utf-8')
+        filename = os.path.basename(filepath).replace('"', '')
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8')
+        self._parts = [head, None, f'\r\n--{self.boundary}--\r\n'.encode('utf-8')]
+        self._length = len(head) + os.path.getsize(filepath) + len(self._parts[2])
+        self._file = open(filepath, 'rb')
+        self._buffer = b''
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        # Lets requests send a Content-Length instead of chunked encoding
+        return self._length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._length
+        while len(self._buffer) < size and self._parts:
+            part = self._parts[0]
+            if part is None:
+                chunk = self._file.read(STREAM_CHUNK_SIZE)
+                if chunk:
+                    self._buffer += chunk
+                    continue
+            else:
+                self._buffer += part
+            self._parts.pop(0)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def send_upload(filepath, email=None, session=None):
+    """Upload one file and return the parsed server response; raises on transport or HTTP errors."""
     url = 'http://localhost:5000/upload'
+    body = MultipartStream(filepath, {'email': email} if email else None)
     try:
-        files = {'file': open(filepath, 'rb')}
-        data = {'email': email} if email else {}
+        response = (session or requests).post(url, data=body, headers={'Content-Type': body.content_type})
+    finally:
+        body.close()
+    response.raise_for_status()
+    return response.json()
 
-        response = requests.post(url, files=files, data=data)
 
-        if response.status_code == 200:
-            try:
-                result = response.json()
-                if 'uid' in result:
-                    print(f"File uploaded successfully. UID: {result['uid']}")
-                else:
-                    print("File uploaded successfully.")
-                    print("Server Response:", result)  # Print the entire response for debugging
-            except ValueError:
-                print("Invalid JSON received from server.")
-                print("Server Response:", response.text)  # Print the entire response for debugging
+def upload_file(filepath, email=None):
+    try:
+        result = send_upload(filepath, email)
+        if 'uid' in result:
+            print(f"File uploaded successfully. UID: {result['uid']}")
         else:
-            print(f"Failed to upload file. Status Code: {response.status_code}")
+            print("File uploaded successfully.")
+            print("Server Response:", result)  # Print the entire response for debugging
+        return result.get('uid')
+    # requests' exceptions subclass IOError (and JSONDecodeError also ValueError), so they go first
+    except requests.exceptions.HTTPError as e:
+        print(f"Failed to upload file. Status Code: {e.response.status_code}")
+        print("Server Response:", e.response.text)
+    except requests.exceptions.JSONDecodeError:
+        print("Invalid JSON received from server.")
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
     except IOError as e:
         print(f"Error opening file: {e}")
+    return None
+
+
+def find_presentations(target):
+    if os.path.isdir(target):
+        target = os.path.join(target, '**', '*.pptx')
+    return sorted(path for path in glob.glob(target, recursive=True) if os.path.isfile(path))
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def bulk_upload(target, email=None, parallelism=BULK_PARALLELISM, wait=False, manifest_path=None):
+    """Upload every presentation under a directory or glob, skipping files the manifest says are already uploaded."""
+    paths = find_presentations(target)
+    if manifest_path is None:
+        manifest_path = os.path.join(target if os.path.isdir(target) else '.', MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    lock = threading.Lock()
+
+    pending = []
+    for path in paths:
+        entry = manifest.get(os.path.abspath(path))
+        # A file edited since its upload is sent again
+        if entry and {'size': entry.get('size'), 'mtime': entry.get('mtime')} == file_signature(path):
+            continue
+        pending.append(path)
+    print(f"Found {len(paths)} presentations; {len(paths) - len(pending)} already uploaded.")
+
+    session = requests.Session()
+    # One pooled connection per upload thread
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=parallelism)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    failures = 0
+    with session, ThreadPoolExecutor(max_workers=parallelism) as executor:
+        futures = {executor.submit(send_upload, path, email, session): path for path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except (IOError, ValueError, requests.exceptions.RequestException) as e:
+                failures += 1
+                print(f"Failed to upload {path}: {e}")
+                continue
+            print(f"Uploaded {path}. UID: {result['uid']}")
+            with lock:
+                manifest[os.path.abspath(path)] = {'uid': result['uid'], **file_signature(path)}
+                save_manifest(manifest_path, manifest)
+
+        uids = [manifest[os.path.abspath(path)]['uid'] for path in paths if os.path.abspath(path) in manifest]
+        print(f"{len(uids)} of {len(paths)} presentations uploaded; {failures} failed.")
+        if wait and uids:
+            return wait_for_batch(uids, session)
+    return None
+
+
+def wait_for_batch(uids, session=None, interval=5):
+    # One /status/batch request per round covers the whole batch
+    url = 'http://localhost:5000/status/batch'
+    remaining = set(uids)
+    statuses = {}
+    try:
+        while remaining:
+            response = (session or requests).post(url, json={'uids': sorted(remaining)[:500]})
+            if response.status_code != 200:
+                print(f"Failed to check status. Status Code: {response.status_code}")
+                return None
+            for uid, result in response.json()['statuses'].items():
+                if result is None or result['status'] in FINAL_STATUSES:
+                    statuses[uid] = result
+                    remaining.discard(uid)
+            done = len(uids) - len(remaining)
+            print(f"{done}/{len(uids)} presentations finished.")
+            if remaining:
+                time.sleep(interval)
     except requests.exceptions.RequestException as e:
         print(f"Request error: {e}")
+        return None
+
+    failed = [uid for uid, result in statuses.items() if result is None or result['status'] == 'failed']
+    if failed:
+        print(f"{len(failed)} presentations failed: {', '.join(failed)}")
+    return statuses
 
 
 def check_status(uid=None, email=None, filename=None):
@@ -50,6 +217,8 @@ def check_status(uid=None, email=None, filename=None):
                 print("Status:", result['status'])
                 print("Filename:", result['filename'])
                 print("Upload Time:", result['timestamp'])
+                if result.get('slides_total'):
+                    print(f"Progress: {result['slides_completed']}/{result['slides_total']} slides")
                 if result['finish_time']:
                     print("Finish Time:", result['finish_time'])
                 if result['error_message']:
@@ -62,37 +231,121 @@ def check_status(uid=None, email=None, filename=None):
     except requests.exceptions.RequestException as e:
         print(f"Request error: {e}")
 
+def wait_for_completion(uid):
+    # Long-poll /status: the server answers as soon as something changes, or with 304 after the wait
+    url = 'http://localhost:5000/status'
+    params = {'uid': uid, 'wait': 30}
+    headers = {}
+
+    try:
+        while True:
+            response = requests.get(url, params=params, headers=headers, timeout=40)
+
+            if response.status_code == 304:
+                continue
+            if response.status_code != 200:
+                print(f"Failed to check status. Status Code: {response.status_code}")
+                return None
+
+            result = response.json()
+            headers['If-None-Match'] = response.headers.get('ETag', '')
+            if result.get('slides_total'):
+                print(f"Status: {result['status']} ({result['slides_completed']}/{result['slides_total']} slides)")
+            else:
+                print(f"Status: {result['status']}")
+            if result['status'] in FINAL_STATUSES:
+                if result['error_message']:
+                    print("Error Message:", result['error_message'])
+                return result
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+
+def download_result(uid, slides=None, output_path=None):
+    # requests asks for gzip and decompresses it, so the server can send its precompressed copy
+    url = f'http://localhost:5000/result/{uid}'
+    params = {'slides': slides} if slides else {}
+
+    try:
+        response = requests.get(url, params=params)
+        if response.status_code != 200:
+            print(f"Failed to download result. Status Code: {response.status_code}")
+            print("Server Response:", response.text)
+            return None
+        explanations = response.json()
+    except ValueError:
+        print("Invalid JSON received from server.")
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(explanations, f, indent=4)
+        print(f"Result saved to {output_path}")
+    else:
+        print(json.dumps(explanations, indent=4))
+    return explanations
+
+
+def cancel_upload(uid):
+    url = f'http://localhost:5000/upload/{uid}'
+
+    try:
+        response = requests.delete(url)
+        if response.status_code != 200:
+            print(f"Failed to cancel upload. Status Code: {response.status_code}")
+            print("Server Response:", response.text)
+            return None
+        print(f"Upload {uid} cancelled.")
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+
 def get_history(email):
     url = 'http://localhost:5000/history'
     params = {'email': email}
 
     try:
-        response = requests.get(url, params=params)
+        # The server returns one page at a time; follow the cursor until there are no more pages
+        while True:
+            response = requests.get(url, params=params)
 
-        if response.status_code == 200:
+            if response.status_code != 200:
+                print(f"Failed to retrieve history. Status Code: {response.status_code}")
+                return
             try:
                 history = response.json()
-                for upload in history:
-                    print(f"UID: {upload['uid']}")
-                    print(f"Filename: {upload['filename']}")
-                    print(f"Upload Time: {upload['upload_time']}")
-                    if upload['finish_time']:
-                        print(f"Finish Time: {upload['finish_time']}")
-                    print(f"Status: {upload['status']}")
-                    if upload['error_message']:
-                        print(f"Error Message: {upload['error_message']}")
-                    print()
             except ValueError:
                 print("Invalid JSON received from server.")
                 print("Server Response:", response.text)  # Print the entire response for debugging
-        else:
-            print(f"Failed to retrieve history. Status Code: {response.status_code}")
+                return
+
+            for upload in history:
+                print(f"UID: {upload['uid']}")
+                print(f"Filename: {upload['filename']}")
+                print(f"Upload Time: {upload['upload_time']}")
+                if upload['finish_time']:
+                    print(f"Finish Time: {upload['finish_time']}")
+                print(f"Status: {upload['status']}")
+                if upload['error_message']:
+                    print(f"Error Message: {upload['error_message']}")
+                print()
+
+            next_cursor = response.headers.get('X-Next-Cursor')
+            if not next_cursor:
+                return
+            params['cursor'] = next_cursor
     except requests.exceptions.RequestException as e:
         print(f"Request error: {e}")
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Error: Please provide 'upload', 'status', 'history', or 'uid' followed by appropriate arguments.")
+        print("Error: Please provide 'upload', 'bulk', 'status', 'wait', 'result', 'cancel', 'history', or 'uid' followed by appropriate arguments.")
         sys.exit(1)
 
     command = sys.argv[1]
@@ -110,6 +363,19 @@ if __name__ == "__main__":
         filepath = sys.argv[2]
         email = sys.argv[3] if len(sys.argv) > 3 else None
         upload_file(filepath, email)
+    elif command == 'bulk':
+        args = sys.argv[2:]
+        wait = '--wait' in args
+        args = [arg for arg in args if arg != '--wait']
+        parallelism = BULK_PARALLELISM
+        if '--parallel' in args:
+            position = args.index('--parallel')
+            parallelism = int(args[position + 1])
+            del args[position:position + 2]
+        if not args:
+            print("Error: Please provide a directory or glob, optionally an email, and --parallel N / --wait.")
+            sys.exit(1)
+        bulk_upload(args[0], args[1] if len(args) > 1 else None, parallelism=parallelism, wait=wait)
     elif command == 'status':
         if len(sys.argv) < 4:
             print("Error: Please provide the UID or both email and filename.")
@@ -117,6 +383,22 @@ if __name__ == "__main__":
         uid = sys.argv[2]
         filename = sys.argv[3]
         check_status(uid=uid, filename=filename)
+    elif command == 'wait':
+        if len(sys.argv) < 3:
+            print("Error: Please provide the UID.")
+            sys.exit(1)
+        wait_for_completion(sys.argv[2])
+    elif command == 'result':
+        if len(sys.argv) < 3:
+            print("Error: Please provide the UID, optionally slides like 1-3,7 and an output file.")
+            sys.exit(1)
+        download_result(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None,
+                        sys.argv[4] if len(sys.argv) > 4 else None)
+    elif command == 'cancel':
+        if len(sys.argv) < 3:
+            print("Error: Please provide the UID.")
+            sys.exit(1)
+        cancel_upload(sys.argv[2])
     elif command == 'history':
         if len(sys.argv) < 3:
             print("Error: Please provide an email to retrieve history.")
@@ -124,5 +406,5 @@ if __name__ == "__main__":
         email = sys.argv[2]
         get_history(email)
     else:
-        print("Invalid command. Please use 'upload', 'status', 'history', or 'uid'.")
+        print("Invalid command. Please use 'upload', 'bulk', 'status', 'wait', 'result', 'cancel', 'history', or 'uid'.")
         sys.exit(1)
@@ -1,9 +1,14 @@
 import os
-import json
 import asyncio
-from pptx import Presentation
-from aiohttp import ClientSession
-from slides_explain.utils import fetch_slide_explanation, combine_slide_text
+from slides_explain.utils import explain_slide_text, presentation_slide_texts
+from slides_explain.ooxml import extract_deck_texts, extract_deck_texts_async, shutdown_parse_pool
+from slides_explain.session_pool import create_session, pool_stats
+from slides_explain.cache import get_cache
+from slides_explain.resilience import RetryableError
+from slides_explain.notify import AsyncWakeup, PollBackoff, UPLOADS_CHANNEL
+from slides_explain.results import result_path, write_result
+from slides_explain.storage import existing_path
+from slides_explain.manifest import UploadManifest
 import logging
 from logging.handlers import TimedRotatingFileHandler
 
@@ -15,6 +20,9 @@ PROCESSING_LOG_FILE = os.path.join(LOGS_FOLDER, 'presentation_processing.log')
 
 os.makedirs(LOGS_FOLDER, exist_ok=True)
 
+# 'ooxml' reads slide XML straight from the package; 'pptx' uses python-pptx's object model
+EXTRACTOR = extract_deck_texts if os.getenv('EXPLAINER_EXTRACTOR', 'ooxml') == 'ooxml' else presentation_slide_texts
+
 # Configure logging for slide processing
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)  # Set the overall logger level
@@ -34,53 +42,88 @@ logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
 
-async def process_slide(slide, session, api_key):
-    slide_text = combine_slide_text(slide)
+async def process_slide(slide_text, session, api_key):
     if slide_text:
         try:
-            explanation = await fetch_slide_explanation(session, slide_text, api_key)
+            explanation = await explain_slide_text(session, slide_text, api_key)
             return explanation
         except Exception as e:
+            # Raised, not saved: an error message must never end up as a slide's explanation
             logger.error(f"Failed to process slide: {e}")
-            return f"Failed to process slide: {e}"
+            raise
     return None
 
 
-async def process_new_uploads():
+async def process_new_uploads(session):
     logger.info("Slide processing script started.")
+    wakeup = AsyncWakeup(UPLOADS_CHANNEL)
+    backoff = PollBackoff()
 
-    while True:
-        for filename in os.listdir(UPLOADS_FOLDER):
-            if filename.endswith('.pptx'):
-                pptx_path = os.path.join(UPLOADS_FOLDER, filename)
-                output_file = os.path.join(OUTPUTS_FOLDER, f"{os.path.splitext(filename)[0]}.json")
-
-                if os.path.exists(output_file):
-                    continue  # Skip if already processed
-
-                logger.info(f"Processing {filename}...")
-                prs = Presentation(pptx_path)
-                tasks = []
-
-                async with ClientSession() as session:
-                    for slide in prs.slides:
-                        task = process_slide(slide, session, "key")
-                        tasks.append(task)
+    # Pending files come from the manifest; new ones from the API's change log, so the folder is never listed
+    manifest = UploadManifest(UPLOADS_FOLDER, OUTPUTS_FOLDER)
 
-                    explanations = await asyncio.gather(*tasks)
-
-                explanations = [exp if exp else "No text content" for exp in explanations]
-
-                with open(output_file, 'w') as f:
-                    json.dump(explanations, f, indent=4)
-                logger.info(f"Processing {filename} completed successfully.")
-
-        await asyncio.sleep(10)  # Check for new uploads every 10 seconds
+    while True:
+        processed = False
+        manifest.sync()
+        for filename in manifest.pending():
+            pptx_path = existing_path(UPLOADS_FOLDER, filename)
+            output_file = result_path(OUTPUTS_FOLDER, os.path.splitext(filename)[0])
+
+            if os.path.exists(output_file):
+                manifest.mark(filename, 'done')
+                continue  # Skip if already processed
+
+            logger.info(f"Processing {filename}...")
+            try:
+                slide_texts = await extract_deck_texts_async(pptx_path, EXTRACTOR)
+            except Exception as e:
+                logger.error(f"Failed to read {filename}: {e}")
+                manifest.mark(filename, 'failed')
+                continue
+            tasks = []
+
+            for slide_text in slide_texts:
+                task = process_slide(slide_text, session, "key")
+                tasks.append(task)
+
+            explanations = await asyncio.gather(*tasks, return_exceptions=True)
+
+            errors = [exp for exp in explanations if isinstance(exp, Exception)]
+            if errors:
+                # Provider trouble leaves the file pending for a later pass; anything else won't fix itself
+                logger.error(f"{len(errors)} slide(s) of {filename} failed, first error: {errors[0]}")
+                if not all(isinstance(error, RetryableError) for error in errors):
+                    manifest.mark(filename, 'failed')
+                continue
+
+            explanations = [exp if exp else "No text content" for exp in explanations]
+
+            write_result(output_file, explanations)
+            manifest.mark(filename, 'done')
+            logger.info(f"Processing {filename} completed successfully.")
+            logger.debug(f"Connection pool: {pool_stats(session)}, cache: {get_cache().stats}")
+            processed = True
+
+        if processed:
+            backoff.reset()
+        # The API announces every upload; the scan interval only matters if an announcement is lost
+        await wakeup.wait(backoff.idle())
+
+
+async def run_worker():
+    # One pooled session for the lifetime of the worker, shared by every upload
+    session = create_session()
+    try:
+        await process_new_uploads(session)
+    finally:
+        await session.close()
+        shutdown_parse_pool()
+        logger.info("HTTP connection pool closed.")
 
 
 if __name__ == '__main__':
     try:
-        asyncio.run(process_new_uploads())
+        asyncio.run(run_worker())
     except KeyboardInterrupt:
         logger.info("Slide processing script ended due to keyboard interrupt.")
     except Exception as e:
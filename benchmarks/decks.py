@@ -0,0 +1,52 @@
+import os
+import random
+from pptx import Presentation
+from pptx.util import Inches
+
+VOCABULARY = ('network', 'latency', 'throughput', 'cache', 'queue', 'thread', 'process', 'memory', 'socket',
+              'protocol', 'request', 'response', 'server', 'client', 'database', 'index', 'transaction', 'lock',
+              'schedule', 'buffer', 'packet', 'kernel', 'compiler', 'function', 'object', 'module', 'test')
+
+
+def make_deck(path: str, slides: int = 20, words_per_slide: int = 40, empty_ratio: float = 0.05,
+              seed: int = None) -> int:
+    """Write a synthetic deck with a title and bullet points per slide; returns the number of slides with text."""
+    rng = random.Random(seed)
+    prs = Presentation()
+    layout = prs.slide_layouts[1]  # Title and content
+    with_text = 0
+    for number in range(1, slides + 1):
+        slide = prs.slides.add_slide(layout)
+        if rng.random() < empty_ratio:
+            # Leave some slides blank, as real decks have section breaks and image-only slides
+            slide.shapes.title.text = ''
+            continue
+        with_text += 1
+        words = max(1, int(rng.gauss(words_per_slide, words_per_slide / 4)))
+        slide.shapes.title.text = f"Topic {number}: {rng.choice(VOCABULARY).title()}"
+        body = slide.placeholders[1].text_frame
+        lines = []
+        remaining = words
+        while remaining > 0:
+            count = min(remaining, rng.randint(5, 12))
+            lines.append(' '.join(rng.choice(VOCABULARY) for _ in range(count)))
+            remaining -= count
+        body.text = lines[0]
+        for line in lines[1:]:
+            body.add_paragraph().text = line
+        if number % 5 == 0:
+            # An extra free-standing text box, like a footnote
+            box = slide.shapes.add_textbox(Inches(1), Inches(6.5), Inches(8), Inches(0.5))
+            box.text_frame.text = f"Note {seed}-{number}: {rng.choice(VOCABULARY)}"
+    prs.save(path)
+    return with_text
+
+
+def make_decks(folder: str, count: int, slides: int = 20, words_per_slide: int = 40, seed: int = 0) -> list:
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(folder, f"deck_{index:03d}.pptx")
+        make_deck(path, slides=slides, words_per_slide=words_per_slide, seed=seed + index)
+        paths.append(path)
+    return paths
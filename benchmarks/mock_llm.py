@@ -0,0 +1,128 @@
+import re
+import json
+import math
+import random
+import asyncio
+import threading
+from dataclasses import dataclass
+from aiohttp import web
+
+BATCH_SLIDE = re.compile(r'^Slide (\d+):', re.MULTILINE)
+WORDS = ('slide', 'explains', 'the', 'idea', 'of', 'a', 'process', 'which', 'shows', 'how', 'data', 'moves',
+         'between', 'stages', 'and', 'why', 'each', 'step', 'matters', 'for', 'the', 'result')
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 200.0     # Median response time
+    latency_sigma: float = 0.5    # Log-normal spread; 0 gives a fixed latency
+    rate_429: float = 0.0         # Fraction of requests answered with 429
+    rate_5xx: float = 0.0         # Fraction of requests answered with 503
+    retry_after: float = 0.0      # Retry-After sent with every 429
+    response_words: int = 60
+    seed: int = None
+
+
+def sample_latency(config: MockConfig, rng: random.Random) -> float:
+    if config.latency_ms <= 0:
+        return 0.0
+    if config.latency_sigma <= 0:
+        return config.latency_ms / 1000
+    return rng.lognormvariate(math.log(config.latency_ms), config.latency_sigma) / 1000
+
+
+def make_text(words: int, rng: random.Random) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def completion(content: str, prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        'object': 'chat.completion',
+        'model': 'mock',
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+        'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                  'total_tokens': prompt_tokens + completion_tokens}
+    }
+
+
+def create_app(config: MockConfig) -> web.Application:
+    """An OpenAI-compatible /v1/chat/completions endpoint with configurable latency and failure rates."""
+    rng = random.Random(config.seed)
+    stats = {'requests': 0, 'rate_limited': 0, 'server_errors': 0}
+
+    async def chat_completions(request):
+        body = await request.json()
+        stats['requests'] += 1
+        await asyncio.sleep(sample_latency(config, rng))
+
+        roll = rng.random()
+        if roll < config.rate_429:
+            stats['rate_limited'] += 1
+            return web.json_response({'error': {'message': 'Rate limit reached', 'type': 'requests',
+                                                'code': 'rate_limit_exceeded'}},
+                                     status=429, headers={'Retry-After': str(config.retry_after)})
+        if roll < config.rate_429 + config.rate_5xx:
+            stats['server_errors'] += 1
+            return web.json_response({'error': {'message': 'The server is overloaded', 'type': 'server_error'}},
+                                     status=503)
+
+        prompt = body['messages'][-1]['content']
+        prompt_tokens = len(prompt) // 4 + 1
+        if body.get('response_format', {}).get('type') == 'json_object':
+            # A batched request: answer every "Slide N:" in the prompt
+            numbers = BATCH_SLIDE.findall(prompt)
+            content = json.dumps({number: make_text(config.response_words, rng) for number in numbers})
+            completion_tokens = config.response_words * len(numbers)
+        else:
+            content = make_text(config.response_words, rng)
+            completion_tokens = config.response_words
+        return web.json_response(completion(content, prompt_tokens, completion_tokens))
+
+    app = web.Application()
+    app['stats'] = stats
+    app.router.add_post('/v1/chat/completions', chat_completions)
+    return app
+
+
+class MockServer:
+    """Runs the mock on its own event loop thread so synchronous and asyncio callers can share it."""
+
+    def __init__(self, config: MockConfig = None, host: str = '127.0.0.1', port: int = 0):
+        self.app = create_app(config or MockConfig())
+        self.host = host
+        self.port = port
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name='mock-llm', daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def stats(self) -> dict:
+        return self.app['stats']
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self) -> 'MockServer':
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+import requests
+from Client.client import FINAL_STATUSES
+from benchmarks.decks import make_decks
+from benchmarks.mock_llm import MockConfig, MockServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = 'mock-key'
+
+
+def percentile(values: list, pct: float) -> float:
+    # Nearest-rank, so small samples report a latency that actually happened
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5 - 1e-9)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb(who: str = 'self') -> float:
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def report(name: str, slides: int, elapsed: float, latencies: list, rss_mb: float, mock_stats: dict) -> dict:
+    result = {
+        'benchmark': name,
+        'decks': len(latencies),
+        'slides': slides,
+        'seconds': round(elapsed, 3),
+        'slides_per_second': round(slides / elapsed, 2) if elapsed else None,
+        'deck_latency_p50': round(percentile(latencies, 50), 3),
+        'deck_latency_p95': round(percentile(latencies, 95), 3),
+        'deck_latency_p99': round(percentile(latencies, 99), 3),
+        'peak_rss_mb': round(rss_mb, 1) if rss_mb is not None else None,
+        'mock': dict(mock_stats)
+    }
+    print(json.dumps(result, indent=2))
+    return result
+
+
+def configure_environment(workdir: str, base_url: str):
+    # Read by the slides_explain modules at import time, and inherited by worker processes
+    os.environ['OPENAI_BASE_URL'] = base_url
+    os.environ['OPENAI_API_KEY'] = API_KEY
+    os.environ['API_KEY'] = API_KEY
+    os.environ.setdefault('EXPLAINER_CACHE_PATH', os.path.join(workdir, 'explanation_cache.db'))
+    os.environ.setdefault('EXPLAINER_NOTIFY_DIR', os.path.join(workdir, 'run'))
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'db', 'benchmark.db')}")
+    os.environ.setdefault('EXPLAINER_BACKOFF_BASE_SECONDS', '0.1')
+
+
+def bench_cli(args, workdir: str, server: MockServer) -> dict:
+    """Run slides_explain.main.main over every deck, --concurrency decks at a time."""
+    from slides_explain.main import main
+
+    paths = make_decks(os.path.join(workdir, 'decks'), args.decks, args.slides, args.words, args.seed)
+    latencies = []
+
+    async def run_deck(path, semaphore):
+        async with semaphore:
+            started = time.perf_counter()
+            await main(path, API_KEY)
+            latencies.append(time.perf_counter() - started)
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(args.concurrency)
+        await asyncio.gather(*[run_deck(path, semaphore) for path in paths])
+
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    elapsed = time.perf_counter() - started
+    return report('cli', args.decks * args.slides, elapsed, latencies, peak_rss_mb('self'), server.stats)
+
+
+def start_api():
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    from web_API.app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass  # The status polling would drown out the report
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name='benchmark-api', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def wait_for_workers(count: int, timeout: float = 30):
+    # Workers subscribe to upload announcements once they have started; without notifications just give them time
+    from slides_explain.notify import SUPPORTED, NOTIFY_DIR, UPLOADS_CHANNEL
+    deadline = time.time() + timeout
+    while SUPPORTED and time.time() < deadline:
+        try:
+            if len(os.listdir(os.path.join(NOTIFY_DIR, UPLOADS_CHANNEL))) >= count:
+                return
+        except FileNotFoundError:
+            pass
+        time.sleep(0.05)
+    time.sleep(0 if SUPPORTED else 5)
+
+
+def parse_time(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+def bench_pipeline(args, workdir: str, server: MockServer) -> dict:
+    """Start --workers worker processes, upload every deck through the API, and time each deck to a final status."""
+    paths = make_decks(os.path.join(workdir, 'decks'), args.decks, args.slides, args.words, args.seed)
+    os.makedirs(os.path.join(workdir, 'db'), exist_ok=True)
+    api, api_url = start_api()
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.getenv('PYTHONPATH')])))
+    workers = [subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, 'explainer.py')], cwd=workdir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+               for _ in range(args.workers)]
+    uploaded = {}
+    try:
+        wait_for_workers(args.workers)
+        with requests.Session() as http:
+            # Workers are idle and waiting, so each deck's latency includes the time to wake one up
+            started = time.time()
+            for path in paths:
+                with open(path, 'rb') as f:
+                    response = http.post(f"{api_url}/upload", files={'file': (os.path.basename(path), f)})
+                response.raise_for_status()
+                uploaded[response.json()['uid']] = time.time()
+
+            statuses = {}
+            deadline = started + args.timeout
+            while len(statuses) < len(uploaded) and time.time() < deadline:
+                time.sleep(0.05)
+                pending = [uid for uid in uploaded if uid not in statuses]
+                response = http.post(f"{api_url}/status/batch", json={'uids': pending[:500]})
+                response.raise_for_status()
+                for uid, status in response.json()['statuses'].items():
+                    if status and status['status'] in FINAL_STATUSES:
+                        statuses[uid] = status
+            elapsed = time.time() - started
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+        api.shutdown()
+
+    if len(statuses) < len(uploaded):
+        print(f"Timed out with {len(uploaded) - len(statuses)} decks unfinished.", file=sys.stderr)
+    latencies = [parse_time(status['finish_time']) - parse_time(status['timestamp'])
+                 for status in statuses.values() if status['finish_time']]
+    failed = sum(1 for status in statuses.values() if status['status'] == 'failed')
+    partial = sum(1 for status in statuses.values() if status['status'] == 'partial')
+    result = report('pipeline', len(statuses) * args.slides, elapsed, latencies, peak_rss_mb('children'),
+                    dict(server.stats, failed_decks=failed, partial_decks=partial))
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure explanation throughput against a local mock LLM server.")
+    parser.add_argument('mode', choices=['cli', 'pipeline'],
+                        help="'cli' drives slides_explain.main.main; 'pipeline' drives upload -> worker -> status.")
+    parser.add_argument('--decks', type=int, default=10)
+    parser.add_argument('--slides', type=int, default=20, help="Slides per deck.")
+    parser.add_argument('--words', type=int, default=40, help="Average words per slide.")
+    parser.add_argument('--concurrency', type=int, default=1, help="Decks processed at once in cli mode.")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes in pipeline mode.")
+    parser.add_argument('--timeout', type=float, default=600, help="Give up on the pipeline after this many seconds.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=MockConfig.latency_ms)
+    parser.add_argument('--latency-sigma', type=float, default=MockConfig.latency_sigma)
+    parser.add_argument('--rate-429', type=float, default=MockConfig.rate_429)
+    parser.add_argument('--rate-5xx', type=float, default=MockConfig.rate_5xx)
+    parser.add_argument('--response-words', type=int, default=MockConfig.response_words)
+    return parser.parse_args(argv)
+
+
+def run(argv=None) -> dict:
+    args = parse_args(argv)
+    config = MockConfig(latency_ms=args.latency_ms, latency_sigma=args.latency_sigma, rate_429=args.rate_429,
+                        rate_5xx=args.rate_5xx, response_words=args.response_words, seed=args.seed)
+    with tempfile.TemporaryDirectory(prefix='explainer-bench-') as workdir, MockServer(config) as server:
+        configure_environment(workdir, server.base_url)
+        previous = os.getcwd()
+        # Logs, outputs and databases all land in the throwaway directory; keep the repo importable from there
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        os.chdir(workdir)
+        try:
+            if args.mode == 'cli':
+                return bench_cli(args, workdir, server)
+            return bench_pipeline(args, workdir, server)
+        finally:
+            os.chdir(previous)
+
+
+if __name__ == '__main__':
+    run()
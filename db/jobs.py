@@ -0,0 +1,133 @@
+import os
+import uuid
+import socket
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_, func
+from db.orm import Upload, User
+
+LEASE_SECONDS = int(os.getenv('EXPLAINER_LEASE_SECONDS', '60'))
+MAX_ATTEMPTS = int(os.getenv('EXPLAINER_MAX_ATTEMPTS', '3'))
+
+# Uploads that can still be cancelled; finished ones keep their result
+CANCELLABLE_STATUSES = ('pending', 'processing')
+
+# How many of the oldest claimable uploads the scheduler chooses between
+CLAIM_CANDIDATES = 50
+
+# Shortest-job-first bias: a queued upload counts as this many slides smaller per minute it waits,
+# so large decks still get their turn
+AGING_SLIDES_PER_MINUTE = 10
+
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _claimable(now):
+    return or_(and_(Upload.status == 'pending', or_(Upload.not_before.is_(None), Upload.not_before <= now)),
+               and_(Upload.status == 'processing', Upload.lease_expires_at < now))
+
+
+def fair_order(candidates, running_by_user, now):
+    """Order (id, user_id, weight, slide_count, upload_time) rows by weighted user share, then job size."""
+    def priority(candidate):
+        upload_id, user_id, weight, slide_count, upload_time = candidate
+        share = running_by_user.get(user_id, 0) / max(weight or 1, 1)
+        waited_minutes = (now - upload_time).total_seconds() / 60
+        size = (slide_count or 0) - waited_minutes * AGING_SLIDES_PER_MINUTE
+        return share, size, upload_time
+
+    return [candidate[0] for candidate in sorted(candidates, key=priority)]
+
+
+def claim_upload(db, worker_id: str, lease_seconds: int = LEASE_SECONDS, running_by_user=None):
+    """Atomically move one pending (or lease-expired) upload to processing for this worker.
+
+    running_by_user maps user_id to the number of uploads this worker already has in progress
+    and is used to share capacity fairly between users.
+    """
+    now = datetime.utcnow()
+    candidates = db.query(Upload.id, Upload.user_id, User.weight, Upload.slide_count, Upload.upload_time) \
+        .outerjoin(User, Upload.user_id == User.id).filter(_claimable(now)) \
+        .order_by(Upload.upload_time).limit(CLAIM_CANDIDATES).all()
+
+    for upload_id in fair_order(candidates, running_by_user or {}, now):
+        # The WHERE clause re-checks claimability, so only one worker's UPDATE can match
+        claimed = db.query(Upload).filter(Upload.id == upload_id, _claimable(now)).update({
+            Upload.status: 'processing',
+            Upload.worker_id: worker_id,
+            Upload.lease_expires_at: now + timedelta(seconds=lease_seconds),
+            Upload.attempts: func.coalesce(Upload.attempts, 0) + 1,
+            Upload.started_time: func.coalesce(Upload.started_time, now),
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            upload = db.query(Upload).filter(Upload.id == upload_id).one()
+            if upload.attempts and upload.attempts > MAX_ATTEMPTS:
+                finish_upload(db, upload, worker_id, status='failed',
+                              error_message=f"Gave up after {MAX_ATTEMPTS} attempts")
+                continue
+            return upload
+    return None
+
+
+def heartbeat(db, upload_id: int, worker_id: str, lease_seconds: int = LEASE_SECONDS) -> bool:
+    """Extend our lease; False means another worker reclaimed the upload."""
+    extended = db.query(Upload).filter(Upload.id == upload_id, Upload.worker_id == worker_id,
+                                       Upload.status == 'processing').update({
+        Upload.lease_expires_at: datetime.utcnow() + timedelta(seconds=lease_seconds),
+    }, synchronize_session=False)
+    db.commit()
+    return extended == 1
+
+
+def record_progress(db, upload_id: int, worker_id: str, slides_completed: int) -> bool:
+    updated = db.query(Upload).filter(Upload.id == upload_id, Upload.worker_id == worker_id,
+                                      Upload.status == 'processing').update({
+        Upload.slides_completed: slides_completed,
+    }, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
+def finish_upload(db, upload, worker_id: str, status: str = 'done', error_message: str = None) -> bool:
+    """Record the outcome, but only if we still hold the lease."""
+    finished = db.query(Upload).filter(Upload.id == upload.id, Upload.worker_id == worker_id,
+                                       Upload.status == 'processing').update({
+        Upload.status: status,
+        Upload.finish_time: datetime.utcnow(),
+        Upload.error_message: error_message,
+        Upload.lease_expires_at: None,
+    }, synchronize_session=False)
+    db.commit()
+    return finished == 1
+
+
+def release_upload(db, upload, worker_id: str, error_message: str = None, delay_seconds: float = 0) -> bool:
+    """Hand an upload back to the queue so it is retried after delay_seconds, keeping whatever it already finished.
+
+    Only used for provider trouble, so the attempt isn't counted; the upload deadline still bounds the retries.
+    """
+    released = db.query(Upload).filter(Upload.id == upload.id, Upload.worker_id == worker_id,
+                                       Upload.status == 'processing').update({
+        Upload.status: 'pending',
+        Upload.worker_id: None,
+        Upload.lease_expires_at: None,
+        Upload.error_message: error_message,
+        Upload.attempts: func.coalesce(Upload.attempts, 1) - 1,
+        Upload.not_before: datetime.utcnow() + timedelta(seconds=delay_seconds),
+    }, synchronize_session=False)
+    db.commit()
+    return released == 1
+
+
+def cancel_upload(db, uid: str) -> bool:
+    """Mark a pending or running upload cancelled; a worker running it stops once it notices."""
+    cancelled = db.query(Upload).filter(Upload.uid == uid, Upload.status.in_(CANCELLABLE_STATUSES)).update({
+        Upload.status: 'cancelled',
+        Upload.finish_time: datetime.utcnow(),
+        Upload.error_message: 'Cancelled by request',
+        Upload.lease_expires_at: None,
+    }, synchronize_session=False)
+    db.commit()
+    return cancelled == 1
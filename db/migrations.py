@@ -0,0 +1,97 @@
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+# (version, name, function); each function gets a connection inside a transaction and the model metadata
+MIGRATIONS = []
+
+
+def migration(version, name):
+    def register(func):
+        MIGRATIONS.append((version, name, func))
+        return func
+    return register
+
+
+@migration(1, 'initial schema')
+def create_tables(conn, metadata):
+    # A fresh database gets the current schema in one go; later migrations then find nothing to do
+    metadata.create_all(conn)
+
+
+@migration(2, 'upload job columns')
+def add_missing_columns(conn, metadata):
+    # Older databases (including ones built by the old setup_db.py) predate the dedup and claim columns
+    inspector = inspect(conn)
+    for table in metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+
+@migration(3, 'indexes for status, history and claim queries')
+def create_indexes(conn, metadata):
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+@migration(4, 'slide fingerprints for revised decks')
+def add_slide_fingerprints(conn, metadata):
+    metadata.tables['slide_fingerprints'].create(conn, checkfirst=True)
+    add_missing_columns(conn, metadata)
+    create_indexes(conn, metadata)
+
+
+@migration(5, 'first claim time for upload deadlines')
+def add_started_time(conn, metadata):
+    add_missing_columns(conn, metadata)
+
+
+@migration(6, 'one active job per user and deck')
+def add_active_upload_index(conn, metadata):
+    create_indexes(conn, metadata)
+
+
+@migration(7, 'recorded slide progress')
+def add_slides_completed(conn, metadata):
+    add_missing_columns(conn, metadata)
+
+
+@migration(8, 'requeue delay after provider errors')
+def add_not_before(conn, metadata):
+    add_missing_columns(conn, metadata)
+
+
+def applied_versions(conn) -> set:
+    conn.execute(text('CREATE TABLE IF NOT EXISTS schema_migrations ('
+                      'version INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, applied_at TIMESTAMP NOT NULL)'))
+    return {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+
+def migrate(engine, metadata):
+    """Apply every migration this database hasn't seen yet, one transaction each."""
+    with engine.begin() as conn:
+        applied = applied_versions(conn)
+
+    for version, name, func in sorted(MIGRATIONS, key=lambda entry: entry[0]):
+        if version in applied:
+            continue
+        try:
+            with engine.begin() as conn:
+                func(conn, metadata)
+                conn.execute(text('INSERT INTO schema_migrations (version, name, applied_at) '
+                                  'VALUES (:version, :name, :applied_at)'),
+                             {'version': version, 'name': name, 'applied_at': datetime.utcnow()})
+        except (IntegrityError, OperationalError):
+            # The API and the workers start together; if another process applied it first, move on
+            with engine.begin() as conn:
+                if version not in applied_versions(conn):
+                    raise
+
+
+def current_version(engine) -> int:
+    with engine.begin() as conn:
+        return max(applied_versions(conn), default=0)
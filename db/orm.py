@@ -1,6 +1,7 @@
+import os
 import uuid
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import create_engine, event, text, Boolean, Column, Index, Integer, String, DateTime, ForeignKey, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 
@@ -11,6 +12,8 @@ class User(Base):
 
     id = Column(Integer, primary_key=True)
     email = Column(String(255), unique=True, nullable=False)
+    # Relative share of worker capacity when several users have uploads queued
+    weight = Column(Integer, default=1)
 
     uploads = relationship('Upload', back_populates='user')
 
@@ -18,16 +21,47 @@ class Upload(Base):
     __tablename__ = 'uploads'
 
     id = Column(Integer, primary_key=True)
-    uid = Column(String(36), default=str(uuid.uuid4()), nullable=False)
+    uid = Column(String(36), default=lambda: str(uuid.uuid4()), nullable=False)
     filename = Column(String(255), nullable=False)
     upload_time = Column(DateTime, default=datetime.utcnow, nullable=False)
     finish_time = Column(DateTime)
     status = Column(String(50), nullable=False, default='pending')
     error_message = Column(Text)
+    content_hash = Column(String(64), index=True)
+    slide_count = Column(Integer)
+    # Slides finished so far, as last recorded by the worker (at most a couple of seconds behind)
+    slides_completed = Column(Integer)
+
+    # Claim bookkeeping for workers; see db/jobs.py
+    worker_id = Column(String(255))
+    lease_expires_at = Column(DateTime)
+    attempts = Column(Integer, default=0)
+    # When a worker first claimed it; the per-upload deadline runs from here across retries
+    started_time = Column(DateTime)
+    # A requeued upload isn't claimed again before this, e.g. while the provider is rate limiting
+    not_before = Column(DateTime)
+
+    # Earlier upload of the same deck whose explanations were reused; see db/revisions.py
+    reused_from_id = Column(Integer)
+    slides_reused = Column(Integer)
 
     user_id = Column(Integer, ForeignKey('users.id'))
     user = relationship('User', back_populates='uploads', cascade='all, delete')
 
+    __table_args__ = (
+        Index('ix_uploads_uid', 'uid'),
+        # Worker claim polling: status filter, oldest first
+        Index('ix_uploads_status_upload_time', 'status', 'upload_time'),
+        # /status lookups by email and filename, newest first
+        Index('ix_uploads_user_filename_upload_time', 'user_id', 'filename', 'upload_time'),
+        # /history pages
+        Index('ix_uploads_user_upload_time_id', 'user_id', 'upload_time', 'id'),
+        # One queued or running job per user and deck, so identical uploads racing each other can't both be queued
+        Index('uq_uploads_user_content_active', 'user_id', 'content_hash', unique=True,
+              sqlite_where=text("status IN ('pending', 'processing')"),
+              postgresql_where=text("status IN ('pending', 'processing')")),
+    )
+
     @property
     def upload_path(self):
         # Define how to construct the upload path
@@ -37,10 +71,62 @@ class Upload(Base):
     def is_done(self):
         return self.status == 'done'
 
+
+class SlideFingerprint(Base):
+    __tablename__ = 'slide_fingerprints'
+
+    id = Column(Integer, primary_key=True)
+    upload_id = Column(Integer, ForeignKey('uploads.id'), nullable=False)
+    slide_index = Column(Integer, nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    # True when the explanation was copied from an earlier upload instead of requested
+    reused = Column(Boolean, default=False, nullable=False)
+
+    __table_args__ = (
+        Index('ix_slide_fingerprints_upload_slide', 'upload_id', 'slide_index'),
+        # Finding earlier decks that share slides
+        Index('ix_slide_fingerprints_fingerprint_upload', 'fingerprint', 'upload_id'),
+    )
+
 # Engine and Session setup
-DATABASE_URL = "sqlite:///db/chinook.db"
-engine = create_engine(DATABASE_URL)
+DATABASE_URL = os.getenv('DATABASE_URL', "sqlite:///db/chinook.db")
+
+# WAL lets the API read while a worker writes; busy_timeout makes writers wait for the lock instead of failing
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'temp_store': 'MEMORY',
+    'cache_size': -16000,  # 16 MB
+}
+
+# Connection pool settings for server databases (PostgreSQL, MySQL, ...)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+
+def make_engine(url=DATABASE_URL):
+    if not url.startswith('sqlite'):
+        return create_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                             pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=True)
+
+    engine = create_engine(url, connect_args={'check_same_thread': False,
+                                              'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000})
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    return engine
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create or upgrade tables
+from db.migrations import migrate  # noqa: E402
+migrate(engine, Base.metadata)
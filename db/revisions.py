@@ -0,0 +1,64 @@
+import os
+import hashlib
+from sqlalchemy import func
+from db.orm import Upload, SlideFingerprint
+from slides_explain.cache import normalize_text
+
+# An earlier deck with a different filename is only reused if it shares at least this share of the slides
+REUSE_MIN_OVERLAP = float(os.getenv('EXPLAINER_REUSE_MIN_OVERLAP', '0.5'))
+
+
+def slide_fingerprint(slide_text: str) -> str:
+    # Whitespace-only edits don't count as changes
+    return hashlib.sha256(normalize_text(slide_text).encode('utf-8')).hexdigest() if slide_text else None
+
+
+def record_fingerprints(db, upload_id: int, fingerprints: list):
+    # A resumed upload records them again
+    db.query(SlideFingerprint).filter(SlideFingerprint.upload_id == upload_id).delete(synchronize_session=False)
+    db.add_all([SlideFingerprint(upload_id=upload_id, slide_index=index, fingerprint=fingerprint)
+                for index, fingerprint in enumerate(fingerprints) if fingerprint])
+    db.commit()
+
+
+def find_previous_deck(db, upload, fingerprints: list):
+    """The same user's finished upload that shares the most slides with this one, preferring the same filename.
+
+    Returns (upload, {fingerprint: slide_index}) or (None, {}).
+    """
+    wanted = {fingerprint for fingerprint in fingerprints if fingerprint}
+    if upload.user_id is None or not wanted:
+        return None, {}
+
+    overlaps = db.query(Upload.id, Upload.filename, func.count(SlideFingerprint.id).label('shared')) \
+        .join(SlideFingerprint, SlideFingerprint.upload_id == Upload.id) \
+        .filter(Upload.user_id == upload.user_id, Upload.status == 'done', Upload.id != upload.id,
+                SlideFingerprint.fingerprint.in_(wanted)) \
+        .group_by(Upload.id, Upload.filename).all()
+
+    eligible = [row for row in overlaps
+                if row.filename == upload.filename or row.shared >= REUSE_MIN_OVERLAP * len(wanted)]
+    if not eligible:
+        return None, {}
+    best = max(eligible, key=lambda row: (row.filename == upload.filename, row.shared, row.id))
+
+    rows = db.query(SlideFingerprint.fingerprint, SlideFingerprint.slide_index) \
+        .filter(SlideFingerprint.upload_id == best.id).all()
+    return db.get(Upload, best.id), {fingerprint: index for fingerprint, index in rows}
+
+
+def mark_reused(db, upload, previous, reused_indexes):
+    db.query(SlideFingerprint).filter(SlideFingerprint.upload_id == upload.id,
+                                      SlideFingerprint.slide_index.in_(reused_indexes)) \
+        .update({SlideFingerprint.reused: True}, synchronize_session=False)
+    db.query(Upload).filter(Upload.id == upload.id).update({
+        Upload.reused_from_id: previous.id,
+        Upload.slides_reused: len(reused_indexes),
+    }, synchronize_session=False)
+    db.commit()
+
+
+def reused_slides(db, upload_id: int) -> set:
+    rows = db.query(SlideFingerprint.slide_index) \
+        .filter(SlideFingerprint.upload_id == upload_id, SlideFingerprint.reused.is_(True)).all()
+    return {index for index, in rows}
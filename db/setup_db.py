@@ -1,41 +1,20 @@
+# Creates or upgrades the database schema. Run from the project root:
+#   python -m db.setup_db [database_url]
+# Without an argument the DATABASE_URL environment variable (or db/chinook.db) is used.
 import os
-import sqlite3
+import sys
+
+# Importing db.orm already migrates the default database, so point it at the requested one first
+if len(sys.argv) > 1:
+    os.environ['DATABASE_URL'] = sys.argv[1]
+
+from db.orm import Base, engine, DATABASE_URL  # noqa: E402
+from db.migrations import migrate, current_version  # noqa: E402
 
 # Create the db folder if it doesn't exist
 if not os.path.exists('db'):
     os.makedirs('db')
 
-# Path to the SQLite database file
-db_path = os.path.join('db', 'uploads.db')
-
-# Connect to the SQLite database (it will be created if it doesn't exist)
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
-
-# Create Users table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS Users (
-    id INTEGER PRIMARY KEY,
-    email TEXT NOT NULL
-)
-''')
-
-# Create Uploads table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS Uploads (
-    id INTEGER PRIMARY KEY,
-    uid TEXT NOT NULL,
-    filename TEXT NOT NULL,
-    upload_time TEXT NOT NULL,
-    finish_time TEXT,
-    status TEXT NOT NULL,
-    user_id INTEGER,
-    FOREIGN KEY (user_id) REFERENCES Users (id)
-)
-''')
-
-# Commit changes and close the connection
-conn.commit()
-conn.close()
+migrate(engine, Base.metadata)
 
-print(f"Database created at {db_path}")
+print(f"Database at {DATABASE_URL} is at schema version {current_version(engine)}")
@@ -3,15 +3,27 @@
 import asyncio
 import logging
 import os
+import signal
+import time
 import json
-from datetime import datetime, timezone
-from pptx import Presentation
-from aiohttp import ClientSession
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from db.orm import Upload, User
+from collections import Counter
+from datetime import datetime
+from db.orm import SessionLocal
+from db.jobs import claim_upload, heartbeat, record_progress, finish_upload, release_upload, new_worker_id, \
+    LEASE_SECONDS
+from db.revisions import slide_fingerprint, record_fingerprints, find_previous_deck, mark_reused
 
-from slides_explain.utils import fetch_slide_explanation, combine_slide_text
+from slides_explain.utils import explain_slide_text, presentation_slide_texts
+from slides_explain.ooxml import extract_deck_texts, extract_deck_texts_async, shutdown_parse_pool
+from slides_explain.session_pool import create_session, pool_stats
+from slides_explain.cache import get_cache
+from slides_explain.notify import publish, AsyncWakeup, PollBackoff, Subscription, STATUS_CHANNEL, UPLOADS_CHANNEL, \
+    CANCEL_CHANNEL
+from slides_explain.resilience import RetryableError, RetryBudget, retry_budget, BREAKER_COOLDOWN_SECONDS
+from slides_explain.results import PartialResultWriter, count_partial, load_partial, partial_path, result_path, \
+    write_result
+from slides_explain.storage import existing_path
+from slides_explain.metrics import Counter as MetricCounter, Gauge, STAGE_SECONDS, ERRORS, start_metrics_server
 
 UPLOADS_FOLDER = 'uploads'
 OUTPUTS_FOLDER = 'outputs'
@@ -21,6 +33,9 @@ PROCESSING_LOG_FILE = os.path.join(LOGS_FOLDER, 'presentation_processing.log')
 
 os.makedirs(LOGS_FOLDER, exist_ok=True)
 
+# 'ooxml' reads slide XML straight from the package; 'pptx' uses python-pptx's object model
+EXTRACTOR = extract_deck_texts if os.getenv('EXPLAINER_EXTRACTOR', 'ooxml') == 'ooxml' else presentation_slide_texts
+
 # Configure logging for slide processing
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)  # Set the overall logger level
@@ -39,78 +54,337 @@ stream_handler.setLevel(logging.DEBUG)  # Set stream handler level to DEBUG
 logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
-# Database setup
-DATABASE_URL = "sqlite:///db/chinook.db"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Database setup lives in db/orm.py (DATABASE_URL, engine tuning, migrations)
 
 
 API_KEY = os.getenv("API_KEY")
+WORKER_ID = new_worker_id()
+MAX_CONCURRENT_UPLOADS = int(os.getenv('EXPLAINER_MAX_CONCURRENT_UPLOADS', '4'))
+# Seconds an upload may take before its remaining slides are skipped and it finishes with what it has; 0 = no limit
+UPLOAD_DEADLINE_SECONDS = float(os.getenv('EXPLAINER_UPLOAD_DEADLINE_SECONDS', '0'))
+SKIPPED_EXPLANATION = "Skipped: the upload ran out of time"
+
+# Seconds between progress writes to the uploads table, which /status/batch reads
+PROGRESS_WRITE_SECONDS = 2
+
+# upload id -> why its task was cancelled, for uploads this worker stopped on purpose
+stop_reasons = {}
+# upload id -> when its progress was last written
+progress_saved_at = {}
+
+SLIDES = MetricCounter('explainer_slides_total', 'Slides processed by outcome.', ['outcome'])
+UPLOADS = MetricCounter('explainer_uploads_total', 'Uploads this worker finished, by final status.', ['status'])
+RUNNING_UPLOADS = Gauge('explainer_uploads_running', 'Uploads this worker is processing right now.')
 
 # Other parts of the script remain the same
 
-async def process_slide(slide, session):
-    slide_text = combine_slide_text(slide)
+class SlidesFailed(Exception):
+    def __init__(self, errors):
+        # Only provider trouble (rate limits, outages) is worth queueing the upload again for
+        self.retryable = all(isinstance(error, RetryableError) for error in errors)
+        # Give the provider at least a breaker cooldown, or as long as it asked for, before the next attempt
+        self.retry_after = max([BREAKER_COOLDOWN_SECONDS] + [getattr(error, 'retry_after', None) or 0
+                                                             for error in errors])
+        super().__init__(f"{len(errors)} slide(s) failed, first error: {errors[0]}")
+
+
+async def process_slide(slide_text, session):
+    # Errors propagate so that they are never saved as a slide's explanation
     if slide_text:
-        try:
-            explanation = await fetch_slide_explanation(session, slide_text, API_KEY)
-            return explanation
-        except Exception as e:
-            logger.error(f"Failed to process slide: {e}")
-            return f"Failed to process slide: {e}"
+        return await explain_slide_text(session, slide_text, API_KEY)
     return None
 
-async def process_new_uploads():
-    logger.info("Slide processing script started.")
 
+def stop_upload(task, upload_id, reason):
+    stop_reasons[upload_id] = reason
+    task.cancel()
+
+
+async def keep_lease(upload_id, worker_id, work):
+    # Runs alongside an upload and renews its lease until cancelled
     while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        db = SessionLocal()
         try:
-            db = SessionLocal()
-            pending_uploads = db.query(Upload).filter(Upload.status == 'pending').all()
+            if not heartbeat(db, upload_id, worker_id):
+                # Cancelled through the API, or reclaimed by another worker; either way stop spending quota on it
+                logger.warning(f"Lost lease on upload {upload_id}, stopping it.")
+                stop_upload(work, upload_id, 'lost lease')
+                return
+        finally:
+            db.close()
 
-            for upload in pending_uploads:
-                pptx_path = os.path.join(UPLOADS_FOLDER, f"{upload.uid}.pptx")
-                output_file = os.path.join(OUTPUTS_FOLDER, f"{upload.uid}.json")
 
-                if os.path.exists(output_file):
-                    continue  # Skip if already processed
+def notify_status(upload, status, **details):
+    publish(STATUS_CHANNEL, {'type': 'status', 'uid': upload.uid, 'user_id': upload.user_id, 'status': status,
+                             **details})
 
-                logger.info(f"Processing {upload.filename}...")
-                prs = Presentation(pptx_path)
-                tasks = []
 
-                async with ClientSession() as session:
-                    for slide in prs.slides:
-                        task = process_slide(slide, session, "your_api_key_here")
-                        tasks.append(task)
+def save_progress(upload_id, slides_completed, force=False):
+    now = time.monotonic()
+    if not force and now - progress_saved_at.get(upload_id, 0) < PROGRESS_WRITE_SECONDS:
+        return
+    progress_saved_at[upload_id] = now
+    db = SessionLocal()
+    try:
+        record_progress(db, upload_id, WORKER_ID, slides_completed)
+    except Exception as e:
+        # Progress is advisory; a busy database must not fail the slide
+        logger.warning(f"Could not record progress of upload {upload_id}: {e}")
+    finally:
+        db.close()
 
-                    explanations = await asyncio.gather(*tasks)
 
-                explanations = [exp if exp else "No text content" for exp in explanations]
+async def process_and_record(upload_id, index, slide_text, session, writer, progress):
+    try:
+        explanation = await process_slide(slide_text, session)
+    except Exception as e:
+        SLIDES.inc(outcome='failed')
+        ERRORS.inc(stage='slide', error=type(e).__name__)
+        raise
+    SLIDES.inc(outcome='explained' if explanation else 'empty')
+    with STAGE_SECONDS.time(stage='write_partial'):
+        writer.write(index, explanation if explanation else "No text content")
+    progress['slides_completed'] += 1
+    publish(STATUS_CHANNEL, progress)
+    save_progress(upload_id, progress['slides_completed'])
 
-                with open(output_file, 'w') as f:
-                    json.dump(explanations, f, indent=4)
 
-                upload.status = 'done'
-                upload.finish_time = datetime.utcnow()
+def reuse_explanations(db, upload, fingerprints, finished, writer):
+    """Copy explanations of unchanged slides from the user's earlier upload of this deck; returns their indexes."""
+    previous, previous_slides = find_previous_deck(db, upload, fingerprints)
+    if previous is None:
+        return []
+    try:
+        with open(result_path(OUTPUTS_FOLDER, previous.uid)) as f:
+            previous_explanations = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not reuse explanations from {previous.uid}: {e}")
+        return []
 
-                db.add(upload)
-                db.commit()
+    reused = [index for index, fingerprint in enumerate(fingerprints)
+              if fingerprint in previous_slides and previous_slides[fingerprint] < len(previous_explanations)]
+    for index in reused:
+        if index not in finished:
+            finished[index] = previous_explanations[previous_slides[fingerprints[index]]]
+            writer.write(index, finished[index])
+    if reused:
+        mark_reused(db, upload, previous, reused)
+        SLIDES.inc(len(reused), outcome='reused')
+        logger.info(f"Reused {len(reused)}/{len(fingerprints)} slide explanations from upload {previous.uid}.")
+    return reused
 
-                logger.info(f"Processing {upload.filename} completed successfully.")
 
-            db.close()
-            await asyncio.sleep(10)  # Check for new uploads every 10 seconds
+async def process_upload(db, upload, session):
+    pptx_path = existing_path(UPLOADS_FOLDER, f"{upload.uid}.pptx")
+    output_file = result_path(OUTPUTS_FOLDER, upload.uid)
+    partial_file = partial_path(OUTPUTS_FOLDER, upload.uid)
+
+    status, error_message = 'done', None
+    if not os.path.exists(output_file):
+        logger.info(f"Processing {upload.filename}...")
+        with STAGE_SECONDS.time(stage='parse'):
+            slides = await extract_deck_texts_async(pptx_path, EXTRACTOR)
+
+        # Slides recorded by an earlier, interrupted attempt are not explained again
+        finished = load_partial(partial_file)
+        if finished:
+            logger.info(f"Resuming {upload.filename} with {len(finished)}/{len(slides)} slides already done.")
+
+        fingerprints = [slide_fingerprint(slide_text) for slide_text in slides]
+        record_fingerprints(db, upload.id, fingerprints)
+
+        writer = PartialResultWriter(partial_file)
+        try:
+            # Only slides that are new or changed since the user's previous version of the deck need the API
+            reuse_explanations(db, upload, fingerprints, finished, writer)
+
+            retry_budget.set(RetryBudget.for_slides(len(slides) - len(finished)))
+            progress = {'type': 'progress', 'uid': upload.uid, 'user_id': upload.user_id, 'status': 'processing',
+                        'slides_completed': len(finished), 'slides_total': len(slides)}
+            save_progress(upload.id, len(finished), force=True)
+            tasks = [process_and_record(upload.id, index, slide_text, session, writer, progress)
+                     for index, slide_text in enumerate(slides) if index not in finished]
+            # The deadline runs from the first claim, so requeued and resumed attempts don't get a fresh one
+            started = upload.started_time or datetime.utcnow()
+            remaining = UPLOAD_DEADLINE_SECONDS - (datetime.utcnow() - started).total_seconds()
+            try:
+                # Running out of time cancels the outstanding slides; the finished ones are already on disk
+                results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True),
+                                                 max(remaining, 0) if UPLOAD_DEADLINE_SECONDS else None)
+            except asyncio.TimeoutError:
+                results = []
+                error_message = f"Deadline of {UPLOAD_DEADLINE_SECONDS:g}s exceeded"
+        finally:
+            writer.close()
+            progress_saved_at.pop(upload.id, None)
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise SlidesFailed(errors)
+
+        finished = load_partial(partial_file)
+        save_progress(upload.id, len(finished), force=True)
+        skipped = len(slides) - len(finished)
+        if skipped:
+            # Not 'done': revision reuse and deduplication must not treat the placeholders as explanations
+            status = 'partial'
+            SLIDES.inc(skipped, outcome='skipped')
+            error_message = f"{error_message}, {skipped} slide(s) skipped"
+            logger.warning(f"{upload.filename}: {error_message}.")
+        explanations = [finished.get(index, SKIPPED_EXPLANATION) for index in range(len(slides))]
+
+        with STAGE_SECONDS.time(stage='write_results'):
+            write_result(output_file, explanations)
+            # A partial upload keeps its per-slide file, which is what /result/<uid>/partial serves
+            if status == 'done':
+                os.remove(partial_file)
+    elif os.path.exists(partial_file):
+        # The previous attempt wrote the result but stopped before recording it
+        if count_partial(partial_file) < (upload.slide_count or 0):
+            status, error_message = 'partial', f"Deadline of {UPLOAD_DEADLINE_SECONDS:g}s exceeded"
+        else:
+            os.remove(partial_file)
+
+    with STAGE_SECONDS.time(stage='db_commit'):
+        finished = finish_upload(db, upload, WORKER_ID, status=status, error_message=error_message)
+    if finished:
+        UPLOADS.inc(status=status)
+        notify_status(upload, status, error_message=error_message)
+        logger.info(f"Processing {upload.filename} finished with status {status}.")
+    else:
+        logger.warning(f"Upload {upload.uid} was reclaimed by another worker before it finished.")
+    logger.debug(f"Connection pool: {pool_stats(session)}, cache: {get_cache().stats}")
+
+
+async def process_claimed_upload(upload, session):
+    # Each concurrently running upload gets its own DB session
+    db = SessionLocal()
+    lease = asyncio.ensure_future(keep_lease(upload.id, WORKER_ID, asyncio.current_task()))
+    RUNNING_UPLOADS.inc()
+    try:
+        with STAGE_SECONDS.time(stage='upload'):
+            await process_upload(db, upload, session)
+    except asyncio.CancelledError:
+        reason = stop_reasons.pop(upload.id, None)
+        if reason is None:
+            raise  # The worker itself is shutting down
+        # Its outstanding slides were cancelled with it; whatever finished stays in the partial results
+        logger.info(f"Stopped {upload.filename}: {reason}.")
+        if reason == 'cancelled':
+            UPLOADS.inc(status='cancelled')
+    except SlidesFailed as e:
+        if e.retryable:
+            logger.warning(f"Requeueing {upload.filename} in {e.retry_after:g}s: {e}")
+            if release_upload(db, upload, WORKER_ID, error_message=str(e), delay_seconds=e.retry_after):
+                UPLOADS.inc(status='requeued')
+                notify_status(upload, 'pending', error_message=str(e))
+        else:
+            logger.error(f"Failed to process {upload.filename}: {e}")
+            if finish_upload(db, upload, WORKER_ID, status='failed', error_message=str(e)):
+                UPLOADS.inc(status='failed')
+                notify_status(upload, 'failed', error_message=str(e))
+    except Exception as e:
+        logger.error(f"Failed to process {upload.filename}: {e}")
+        ERRORS.inc(stage='upload', error=type(e).__name__)
+        if finish_upload(db, upload, WORKER_ID, status='failed', error_message=str(e)):
+            UPLOADS.inc(status='failed')
+            notify_status(upload, 'failed', error_message=str(e))
+    finally:
+        RUNNING_UPLOADS.dec()
+        lease.cancel()
+        db.close()
+
+
+async def process_new_uploads(session, stopping: asyncio.Event = None):
+    """Claim and process uploads until stopping is set, then let the running ones finish."""
+    logger.info(f"Slide processing script started as worker {WORKER_ID}.")
+    running = {}  # task -> user_id of the upload it is processing
+    running_uploads = {}  # uid -> (task, upload id)
+    wakeup = AsyncWakeup(UPLOADS_CHANNEL)
+    loop = asyncio.get_running_loop()
+
+    def cancel_running(uid):
+        if uid in running_uploads:
+            task, upload_id = running_uploads[uid]
+            stop_upload(task, upload_id, 'cancelled')
+
+    # Called on the subscription thread
+    cancellations = Subscription(CANCEL_CHANNEL, lambda message: loop.call_soon_threadsafe(cancel_running,
+                                                                                           message.get('uid')))
+    backoff = PollBackoff()
+    stopping = stopping or asyncio.Event()
+    stop_requested = asyncio.ensure_future(stopping.wait())
+
+    while not stopping.is_set():
+        claimed = False
+        # Claimed uploads outlive this session, and later claims' commits must not expire them
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            # Fill free upload slots; slides from all of them share the dispatcher's budget
+            while len(running) < MAX_CONCURRENT_UPLOADS:
+                with STAGE_SECONDS.time(stage='claim'):
+                    upload = claim_upload(db, WORKER_ID, running_by_user=Counter(running.values()))
+                if upload is None:
+                    break
+                logger.info(f"Claimed {upload.filename} ({upload.slide_count} slides), "
+                            f"{len(running) + 1}/{MAX_CONCURRENT_UPLOADS} uploads running.")
+                notify_status(upload, 'processing')
+                task = asyncio.ensure_future(process_claimed_upload(upload, session))
+                running[task] = upload.user_id
+                running_uploads[upload.uid] = (task, upload.id)
+                task.add_done_callback(lambda _, uid=upload.uid: running_uploads.pop(uid, None))
+                claimed = True
 
         except Exception as e:
             logger.error(f"Failed to fetch pending uploads: {e}")
+        finally:
             db.close()
-            await asyncio.sleep(10)  # Retry after 10 seconds if an error occurred
+
+        if claimed:
+            backoff.reset()
+
+        # Wake as soon as a slot frees or, with a slot free, a new upload is announced;
+        # otherwise poll again after the (growing) fallback interval
+        waiters = list(running) + [stop_requested]
+        announced = None
+        if len(running) < MAX_CONCURRENT_UPLOADS:
+            announced = asyncio.ensure_future(wakeup.wait())
+            waiters.append(announced)
+        done, _ = await asyncio.wait(waiters, timeout=backoff.idle(), return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            running.pop(task, None)
+        if announced is not None and not announced.done():
+            announced.cancel()
+
+    if running:
+        logger.info(f"Draining: waiting for {len(running)} running upload(s) to finish.")
+        await asyncio.wait(running)
+    wakeup.close()
+    cancellations.close()
+
+
+async def run_worker():
+    # One pooled session for the lifetime of the worker, shared by every upload
+    session = create_session()
+    start_metrics_server()
+    # SIGTERM (e.g. from the supervisor) stops claiming new uploads and finishes the running ones
+    stopping = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+    except NotImplementedError:
+        pass  # No loop signal handlers on Windows
+    try:
+        await process_new_uploads(session, stopping)
+    finally:
+        await session.close()
+        shutdown_parse_pool()
+        logger.info("HTTP connection pool closed.")
 
 
 if __name__ == '__main__':
     try:
-        asyncio.run(process_new_uploads())
+        asyncio.run(run_worker())
     except KeyboardInterrupt:
         logger.info("Slide processing script ended due to keyboard interrupt.")
     except Exception as e:
@@ -0,0 +1,118 @@
+import os
+import asyncio
+import logging
+from slides_explain.resilience import RetryableError
+
+BATCH_SLIDES = os.getenv('EXPLAINER_BATCH_SLIDES', '0') == '1'
+# Slides estimated at or below this many prompt tokens are eligible for batching
+SHORT_SLIDE_TOKENS = int(os.getenv('EXPLAINER_SHORT_SLIDE_TOKENS', '60'))
+BATCH_TOKEN_BUDGET = int(os.getenv('EXPLAINER_BATCH_TOKEN_BUDGET', '600'))
+BATCH_MAX_SLIDES = int(os.getenv('EXPLAINER_BATCH_MAX_SLIDES', '10'))
+# How long the first short slide waits for others to join its batch
+BATCH_WINDOW_SECONDS = float(os.getenv('EXPLAINER_BATCH_WINDOW_SECONDS', '0.05'))
+
+
+class SlideBatcher:
+    """Coalesces concurrently requested short slides into one request per api key.
+
+    send_batch(session, texts, api_key) must return one explanation per text or raise;
+    unless the provider itself is failing, every slide in a failed batch is retried alone through send_single.
+    """
+
+    def __init__(self, send_batch, send_single, estimate_tokens, token_budget: int = BATCH_TOKEN_BUDGET,
+                 max_slides: int = BATCH_MAX_SLIDES, window: float = BATCH_WINDOW_SECONDS):
+        self.send_batch = send_batch
+        self.send_single = send_single
+        self.estimate_tokens = estimate_tokens
+        self.token_budget = token_budget
+        self.max_slides = max_slides
+        self.window = window
+        self._pending = {}  # api_key -> (session, [(text, future)], tokens)
+        self._timers = {}
+        self._sending = set()
+
+    async def explain(self, session, slide_text: str, api_key: str) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        tokens = self.estimate_tokens(slide_text)
+
+        pending = self._pending.get(api_key)
+        if pending and pending[2] + tokens > self.token_budget:
+            self._flush(api_key)
+            pending = None
+        if pending is None:
+            pending = (session, [], 0)
+        pending = (pending[0], pending[1] + [(slide_text, future)], pending[2] + tokens)
+        self._pending[api_key] = pending
+
+        if len(pending[1]) >= self.max_slides:
+            self._flush(api_key)
+        elif api_key not in self._timers:
+            self._timers[api_key] = loop.call_later(self.window, self._flush, api_key)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            self._withdraw(api_key, future)
+            raise
+
+    def _withdraw(self, api_key, future):
+        # A cancelled slide that hasn't been sent yet leaves its batch
+        pending = self._pending.get(api_key)
+        if not pending or not any(waiting is future for _, waiting in pending[1]):
+            return
+        batch = [(text, waiting) for text, waiting in pending[1] if waiting is not future]
+        if batch:
+            self._pending[api_key] = (pending[0], batch, sum(self.estimate_tokens(text) for text, _ in batch))
+        else:
+            del self._pending[api_key]
+            timer = self._timers.pop(api_key, None)
+            if timer is not None:
+                timer.cancel()
+
+    def _flush(self, api_key):
+        timer = self._timers.pop(api_key, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(api_key, None)
+        if pending:
+            task = asyncio.ensure_future(self._send(pending[0], pending[1], api_key))
+            # Keep a reference so the task isn't garbage collected mid-flight
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+            # Once every slide in the batch is cancelled (upload cancelled or out of time), so is the request
+            for _, future in pending[1]:
+                future.add_done_callback(lambda _, task=task, batch=pending[1]: self._cancel_if_abandoned(task, batch))
+
+    @staticmethod
+    def _cancel_if_abandoned(task, batch):
+        if all(future.cancelled() for _, future in batch):
+            task.cancel()
+
+    async def _send(self, session, batch, api_key):
+        texts = [text for text, _ in batch]
+        if len(batch) > 1:
+            try:
+                explanations = await self.send_batch(session, texts, api_key)
+            except RetryableError as e:
+                # The provider itself is failing; single requests would only fail the same way
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            except Exception as e:
+                logging.warning(f"Batch of {len(batch)} slides failed ({e}); retrying them one by one.")
+            else:
+                for (_, future), explanation in zip(batch, explanations):
+                    if not future.done():
+                        future.set_result(explanation)
+                return
+
+        results = await asyncio.gather(*[self.send_single(session, text, api_key) for text in texts],
+                                       return_exceptions=True)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,233 @@
+import os
+import re
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from slides_explain.metrics import Counter, ERRORS
+
+CACHE_PATH = os.getenv('EXPLAINER_CACHE_PATH', os.path.join('db', 'explanation_cache.db'))
+CACHE_MEMORY_ENTRIES = int(os.getenv('EXPLAINER_CACHE_MEMORY_ENTRIES', '2048'))
+CACHE_MAX_BYTES = int(os.getenv('EXPLAINER_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+CACHE_TTL_SECONDS = int(os.getenv('EXPLAINER_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+# Several worker processes share the file; wait briefly for a lock rather than SQLite's default 5 s
+CACHE_BUSY_TIMEOUT_SECONDS = float(os.getenv('EXPLAINER_CACHE_BUSY_TIMEOUT_SECONDS', '0.2'))
+
+# Run size/TTL eviction on disk after this many writes rather than on every one
+EVICT_EVERY = 100
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def cache_key(slide_text: str, model: str, prompt_template: str) -> str:
+    digest = hashlib.sha256()
+    for part in (model, prompt_template, normalize_text(slide_text)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ExplanationCache:
+    """In-memory LRU in front of an SQLite table of explanations keyed by content hash.
+
+    lookup/store are the event-loop versions of get/set: the disk tier runs on a single thread of its own.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, memory_entries: int = CACHE_MEMORY_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES, ttl_seconds: int = CACHE_TTL_SECONDS,
+                 busy_timeout: float = CACHE_BUSY_TIMEOUT_SECONDS):
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._writes = 0
+        # key -> last disk hit, written out in bulk instead of one UPDATE per hit
+        self._touched = {}
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+        self._conn = None
+        self._executor = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            try:
+                self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+                # Readers don't wait for the other workers' writes, and writes don't wait for their reads
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS explanations (
+                    key TEXT PRIMARY KEY,
+                    explanation TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                ''')
+                self._conn.execute('CREATE INDEX IF NOT EXISTS ix_explanations_accessed_at '
+                                   'ON explanations (accessed_at)')
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._disk_failed('open', e)
+                self.close()
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='explanation-cache')
+
+    def _disk_failed(self, operation, error):
+        # The disk tier is shared between workers and only an optimisation, so a failure there never fails a slide
+        logging.warning(f"Explanation cache {operation} failed, using the memory tier only: {error}")
+        ERRORS.inc(stage='cache', error=type(error).__name__)
+        if self._conn is not None:
+            try:
+                self._conn.rollback()
+            except sqlite3.Error:
+                pass
+
+    def _remember(self, key, explanation, created_at):
+        self._memory[key] = (explanation, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _memory_get(self, key, now):
+        entry = self._memory.get(key)
+        if entry is not None:
+            explanation, created_at = entry
+            if now - created_at <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return explanation
+            del self._memory[key]
+        return None
+
+    def _disk_get(self, key, now):
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute('SELECT explanation, created_at FROM explanations WHERE key = ?',
+                                     (key,)).fetchone()
+        except sqlite3.Error as e:
+            self._disk_failed('lookup', e)
+            return None
+        if not row or now - row[1] > self.ttl_seconds:
+            return None
+        self._touched[key] = now
+        if len(self._touched) >= EVICT_EVERY:
+            self._flush_touched()
+        return row
+
+    def _found(self, key, row):
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        self._remember(key, row[0], row[1])
+        self.stats['disk_hits'] += 1
+        return row[0]
+
+    def _disk_set(self, key, explanation, now):
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute('INSERT OR REPLACE INTO explanations VALUES (?, ?, ?, ?, ?)',
+                               (key, explanation, len(explanation.encode('utf-8')), now, now))
+            self._conn.commit()
+        except sqlite3.Error as e:
+            self._disk_failed('write', e)
+            return
+
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def _flush_touched(self):
+        touched, self._touched = self._touched, {}
+        if not touched or self._conn is None:
+            return
+        try:
+            self._conn.executemany('UPDATE explanations SET accessed_at = ? WHERE key = ?',
+                                   [(accessed_at, key) for key, accessed_at in touched.items()])
+            self._conn.commit()
+        except sqlite3.Error as e:
+            # Only the eviction order goes stale
+            self._disk_failed('access time update', e)
+
+    def get(self, key: str):
+        now = time.time()
+        explanation = self._memory_get(key, now)
+        if explanation is not None:
+            return explanation
+        return self._found(key, self._disk_get(key, now))
+
+    def set(self, key: str, explanation: str):
+        now = time.time()
+        self._remember(key, explanation, now)
+        self._disk_set(key, explanation, now)
+
+    async def lookup(self, key: str):
+        now = time.time()
+        explanation = self._memory_get(key, now)
+        if explanation is not None:
+            return explanation
+        if self._executor is None:
+            return self._found(key, None)
+        row = await asyncio.get_running_loop().run_in_executor(self._executor, self._disk_get, key, now)
+        return self._found(key, row)
+
+    async def store(self, key: str, explanation: str):
+        now = time.time()
+        self._remember(key, explanation, now)
+        if self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._disk_set, key, explanation, now)
+
+    def evict(self):
+        if self._conn is None:
+            return
+        self._flush_touched()
+        try:
+            expired = self._conn.execute('DELETE FROM explanations WHERE created_at < ?',
+                                         (time.time() - self.ttl_seconds,)).rowcount
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM explanations').fetchone()[0]
+            evicted = 0
+            if total > self.max_bytes:
+                for key, size in self._conn.execute('SELECT key, size FROM explanations '
+                                                    'ORDER BY accessed_at').fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute('DELETE FROM explanations WHERE key = ?', (key,))
+                    total -= size
+                    evicted += 1
+            self._conn.commit()
+            self.stats['evictions'] += expired + evicted
+        except sqlite3.Error as e:
+            self._disk_failed('eviction', e)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._conn is not None:
+            self._flush_touched()
+            self._conn.close()
+            self._conn = None
+
+
+_cache = None
+
+CACHE_LOOKUPS = Counter('explainer_cache_lookups_total', 'Explanation cache lookups by result.', ['result'],
+                        function=lambda: {(name,): _cache.stats[name]
+                                          for name in ('memory_hits', 'disk_hits', 'misses')} if _cache else {})
+CACHE_EVICTIONS = Counter('explainer_cache_evictions_total', 'Entries expired or evicted from the disk cache.',
+                          function=lambda: _cache.stats['evictions'] if _cache else 0)
+
+
+def get_cache() -> ExplanationCache:
+    global _cache
+    if _cache is None:
+        _cache = ExplanationCache()
+        logging.info(f"Explanation cache opened at {CACHE_PATH or '(memory only)'}")
+    return _cache
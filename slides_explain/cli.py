@@ -1,5 +1,6 @@
 import argparse
 import os
+import sys
 import asyncio
 import logging
 from slides_explain.main import main
@@ -20,4 +21,9 @@ def cli():
         print("Error: Please set the OPENAI_API_KEY environment variable.")
         return
     logging.info("Processing presentation...")
-    asyncio.run(main(pptx_path, api_key))
\ No newline at end of file
+    try:
+        asyncio.run(main(pptx_path, api_key))
+    except Exception as e:
+        logging.error(f"Processing failed: {e}")
+        print(f"Error: {e}")
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,173 @@
+import os
+import time
+import struct
+import asyncio
+import logging
+from contextlib import contextmanager
+from slides_explain.resilience import CircuitBreaker
+from slides_explain.metrics import Gauge, STAGE_SECONDS, TOKENS
+
+# Provider budgets, overridable per deployment
+MAX_IN_FLIGHT = int(os.getenv('EXPLAINER_MAX_IN_FLIGHT', '8'))
+REQUESTS_PER_MINUTE = int(os.getenv('EXPLAINER_REQUESTS_PER_MINUTE', '60'))
+TOKENS_PER_MINUTE = int(os.getenv('EXPLAINER_TOKENS_PER_MINUTE', '60000'))
+# Set by the supervisor so its worker processes draw on one shared budget instead of one each
+SHARED_BUDGET_DIR = os.getenv('EXPLAINER_SHARED_BUDGET_DIR')
+
+# Rough cost of one slide request when the caller doesn't know better
+DEFAULT_REQUEST_TOKENS = 500
+
+
+class TokenBucket:
+    """Continuously refilling bucket; acquire() waits until enough tokens are available."""
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, amount: float) -> float:
+        # Takes the tokens and returns 0, or returns how long until there will be enough
+        self._refill()
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return 0
+        return (amount - self._tokens) / self.rate
+
+    async def acquire(self, amount: float = 1):
+        # A single request larger than the whole bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Holding the lock while sleeping keeps waiters in FIFO order
+        async with self._lock:
+            while True:
+                wait = self._take(amount)
+                if not wait:
+                    return
+                await asyncio.sleep(wait)
+
+    def refund(self, amount: float):
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose level lives in a small file, so several worker processes spend one budget.
+
+    Every take or refund holds an exclusive flock for a few microseconds; time.monotonic() is system-wide on Linux,
+    so the timestamps stored by different processes are comparable.
+    """
+
+    STATE = struct.Struct('dd')  # tokens, updated
+
+    def __init__(self, path: str, per_minute: float, capacity: float = None):
+        super().__init__(per_minute, capacity)
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    @contextmanager
+    def _shared_state(self):
+        import fcntl
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            data = os.pread(self._fd, self.STATE.size, 0)
+            if len(data) == self.STATE.size:
+                self._tokens, self._updated = self.STATE.unpack(data)
+            yield
+            os.pwrite(self._fd, self.STATE.pack(self._tokens, self._updated), 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _take(self, amount: float) -> float:
+        with self._shared_state():
+            return super()._take(amount)
+
+    def refund(self, amount: float):
+        with self._shared_state():
+            super().refund(amount)
+
+
+def _budget_bucket(name: str, per_minute: int) -> TokenBucket:
+    if SHARED_BUDGET_DIR:
+        return SharedTokenBucket(os.path.join(SHARED_BUDGET_DIR, f"{name}.bucket"), per_minute)
+    return TokenBucket(per_minute)
+
+
+class SlideDispatcher:
+    """Caps in-flight API calls and keeps them inside the requests/tokens per minute budgets."""
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, requests_per_minute: int = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = TOKENS_PER_MINUTE, breaker: CircuitBreaker = None):
+        self.max_in_flight = max_in_flight
+        self.breaker = breaker
+        self.request_bucket = _budget_bucket('requests', requests_per_minute)
+        self.token_bucket = _budget_bucket('tokens', tokens_per_minute)
+        self._semaphore = None
+        self.in_flight = 0
+        self.queued = 0
+
+    async def submit(self, func, *args, tokens: int = DEFAULT_REQUEST_TOKENS, **kwargs):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.queued += 1
+        started = False
+        submitted = time.perf_counter()
+        try:
+            async with self._semaphore:
+                # While the provider is unhealthy nothing is sent, not even requests that already hold a slot
+                if self.breaker is not None:
+                    await self.breaker.wait()
+                # Spend budget only once a slot is free, right before the request goes out
+                await self.request_bucket.acquire(1)
+                await self.token_bucket.acquire(tokens)
+                self.queued -= 1
+                self.in_flight += 1
+                started = True
+                STAGE_SECONDS.observe(time.perf_counter() - submitted, stage='queue_wait')
+                TOKENS.inc(tokens, kind='reserved')
+                try:
+                    with STAGE_SECONDS.time(stage='api_call'):
+                        return await func(*args, **kwargs)
+                finally:
+                    self.in_flight -= 1
+        finally:
+            if not started:
+                self.queued -= 1
+
+    async def map(self, func, items, tokens_for=None):
+        # gather preserves argument order, so results line up with items (slide order)
+        tasks = [self.submit(func, item, tokens=tokens_for(item) if tokens_for else DEFAULT_REQUEST_TOKENS)
+                 for item in items]
+        return await asyncio.gather(*tasks)
+
+
+_dispatcher = None
+
+
+def get_dispatcher() -> SlideDispatcher:
+    # One dispatcher per process so every deck shares the same provider budget
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = SlideDispatcher(breaker=CircuitBreaker())
+        logging.info(f"Slide dispatcher started: max_in_flight={MAX_IN_FLIGHT}, "
+                     f"rpm={REQUESTS_PER_MINUTE}, tpm={TOKENS_PER_MINUTE}"
+                     f"{', shared across processes' if SHARED_BUDGET_DIR else ''}")
+    return _dispatcher
+
+
+IN_FLIGHT = Gauge('explainer_requests_in_flight', 'Provider requests currently being sent.',
+                  function=lambda: _dispatcher.in_flight if _dispatcher else 0)
+QUEUED = Gauge('explainer_requests_queued', 'Requests waiting for a slot, the rate limits or the circuit breaker.',
+               function=lambda: _dispatcher.queued if _dispatcher else 0)
+CIRCUIT_OPEN = Gauge('explainer_circuit_open', '1 while the circuit breaker is holding back requests.',
+                     function=lambda: int(bool(_dispatcher and _dispatcher.breaker
+                                               and _dispatcher.breaker.state != 'closed')))
+
@@ -2,8 +2,8 @@ import os
 import json
 import asyncio
 from pptx import Presentation
-from aiohttp import ClientSession
-from slides_explain.utils import fetch_slide_explanation, combine_slide_text
+from slides_explain.utils import explain_slide_text, combine_slide_text
+from slides_explain.session_pool import create_session
 import logging
 
 logging.basicConfig(filename='presentation_processing.log', level=logging.INFO,
@@ -12,23 +12,28 @@ async def process_slide(slide, session, api_key):
     slide_text = combine_slide_text(slide)
     if slide_text:
         try:
-            explanation = await fetch_slide_explanation(session, slide_text, api_key)
+            explanation = await explain_slide_text(session, slide_text, api_key)
             return explanation
         except Exception as e:
+            # Raised, not saved: an error message must never end up as a slide's explanation
             logging.error(f"Failed to process slide: {e}")
-            return f"Failed to process slide: {e}"
+            raise
     return None
 
 async def main(pptx_path, api_key):
     prs = Presentation(pptx_path)
     tasks = []
 
-    async with ClientSession() as session:
+    async with create_session() as session:
         for slide in prs.slides:
             task = process_slide(slide, session, api_key)
             tasks.append(task)
 
-        explanations = await asyncio.gather(*tasks)
+        explanations = await asyncio.gather(*tasks, return_exceptions=True)
+
+    errors = [exp for exp in explanations if isinstance(exp, Exception)]
+    if errors:
+        raise RuntimeError(f"{len(errors)} slide(s) failed, no output written; first error: {errors[0]}")
 
     explanations = [exp if exp else "No text content" for exp in explanations]
 
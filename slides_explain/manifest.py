@@ -0,0 +1,100 @@
+import os
+import time
+import sqlite3
+import logging
+from slides_explain.storage import change_log_path, existing_path, SHARD_CHARS
+
+MANIFEST_NAME = 'manifest.db'
+
+
+class UploadManifest:
+    """SQLite index of the uploads folder, so the file-based worker never lists it.
+
+    New files are picked up from the folder's change log, read from the last offset each time;
+    pending work comes from an indexed query. A missing manifest is rebuilt with one full scan.
+    """
+
+    def __init__(self, uploads_folder: str, outputs_folder: str, path: str = None):
+        self.uploads_folder = uploads_folder
+        self.outputs_folder = outputs_folder
+        self.path = path or os.path.join(uploads_folder, MANIFEST_NAME)
+        fresh = not os.path.exists(self.path)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS files (
+                name TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_files_status_updated_at ON files (status, updated_at);
+            CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        ''')
+        if fresh:
+            self.rescan()
+
+    def _offset(self) -> int:
+        row = self._conn.execute("SELECT value FROM state WHERE key = 'change_log_offset'").fetchone()
+        return row[0] if row else 0
+
+    def _set_offset(self, offset: int):
+        self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('change_log_offset', ?)", (offset,))
+
+    def _add(self, names):
+        now = time.time()
+        self._conn.executemany("INSERT OR IGNORE INTO files (name, status, updated_at) VALUES (?, 'pending', ?)",
+                               [(name, now) for name in names])
+
+    def rescan(self):
+        """Index every presentation in the folder; only needed once, or after files were copied in by hand."""
+        try:
+            log_size = os.path.getsize(change_log_path(self.uploads_folder))
+        except FileNotFoundError:
+            log_size = 0
+        names = []
+        with os.scandir(self.uploads_folder) as entries:
+            for entry in entries:
+                if entry.is_dir() and len(entry.name) == SHARD_CHARS:
+                    names.extend(name for name in os.listdir(entry.path) if name.endswith('.pptx'))
+                elif entry.name.endswith('.pptx'):
+                    names.append(entry.name)  # Flat layout from before sharding
+        self._add(names)
+        # Files already explained by an earlier worker stay done
+        for name, in self._conn.execute("SELECT name FROM files WHERE status = 'pending'").fetchall():
+            if os.path.exists(existing_path(self.outputs_folder, f"{os.path.splitext(name)[0]}.json")):
+                self.mark(name, 'done')
+        # Everything logged so far is covered by the scan
+        self._set_offset(log_size)
+        self._conn.commit()
+        logging.info(f"Indexed {len(names)} uploads into {self.path}.")
+
+    def sync(self) -> int:
+        """Add files appended to the change log since the last sync; returns how many were read."""
+        offset = self._offset()
+        try:
+            with open(change_log_path(self.uploads_folder), 'rb') as log:
+                log.seek(offset)
+                data = log.read()
+        except FileNotFoundError:
+            return 0
+        # A line still being written is left for the next sync
+        complete = data[:data.rfind(b'\n') + 1]
+        if not complete:
+            return 0
+        names = [line for line in complete.decode('utf-8').splitlines() if line]
+        self._add(names)
+        self._set_offset(offset + len(complete))
+        self._conn.commit()
+        return len(names)
+
+    def pending(self, limit: int = 100) -> list:
+        rows = self._conn.execute("SELECT name FROM files WHERE status = 'pending' ORDER BY updated_at LIMIT ?",
+                                  (limit,)).fetchall()
+        return [name for name, in rows]
+
+    def mark(self, name: str, status: str):
+        self._conn.execute('UPDATE files SET status = ?, updated_at = ? WHERE name = ?', (status, time.time(), name))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
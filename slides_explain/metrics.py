@@ -0,0 +1,188 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Worker metrics port; 0 turns the endpoint off
+METRICS_PORT = int(os.getenv('EXPLAINER_METRICS_PORT', '9100'))
+METRICS_HOST = os.getenv('EXPLAINER_METRICS_HOST', '0.0.0.0')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers a few milliseconds of parsing up to minute-long rate-limited API calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REGISTRY = []
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A metric family in the Prometheus text format; thread-safe so the API's request threads can share it.
+
+    function, if given, is called at scrape time and returns a value (or a dict of label values -> value)
+    for metrics that mirror state kept elsewhere, such as the dispatcher's queue depth.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), function=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def _add(self, amount, labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self.function is not None:
+            current = self.function()
+            values = current if isinstance(current, dict) else {(): current}
+            values = {key if isinstance(key, tuple) else (key,): value for key, value in values.items()}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines += [f'{name}{labels} {_format_value(value)}' for name, labels, value in self.samples()]
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        self._add(amount, labels)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1, **labels):
+        self._add(-amount, labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # Per label set: [count per bucket..., sum]
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0.0])
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[position] += 1
+                    break
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[:-1]) if state else 0
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+        for key, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f'{self.name}_bucket', _format_labels(self.labelnames, key, [('le', _format_value(bound))]), \
+                    cumulative
+            yield f'{self.name}_sum', _format_labels(self.labelnames, key), state[-1]
+            yield f'{self.name}_count', _format_labels(self.labelnames, key), cumulative
+
+
+def render() -> str:
+    families = []
+    for metric in REGISTRY:
+        try:
+            families.append(metric.render())
+        except Exception as e:
+            # One broken callback must not take the whole scrape down
+            logging.error(f"Failed to render metric {metric.name}: {e}")
+    return '\n'.join(families) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the worker log
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """Serve /metrics from a background thread; returns the server, or None when disabled or the port is taken."""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logging.warning(f"Metrics endpoint disabled, could not bind {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+    return server
+
+
+# Shared families; the API and the worker each report the stages they run
+STAGE_SECONDS = Histogram('explainer_stage_seconds', 'Time spent in each processing stage.', ['stage'])
+ERRORS = Counter('explainer_errors_total', 'Errors by stage and exception class.', ['stage', 'error'])
+TOKENS = Counter('explainer_tokens_total', 'Tokens reserved against the budget and reported by the provider.', ['kind'])
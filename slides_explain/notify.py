@@ -0,0 +1,172 @@
+import os
+import json
+import queue
+import asyncio
+import uuid
+import socket
+import logging
+import threading
+
+# Each subscriber binds a datagram socket in NOTIFY_DIR/<channel>/; publishers send to every socket there.
+# Where Unix sockets aren't available publishing is a no-op and everyone falls back to polling.
+NOTIFY_DIR = os.getenv('EXPLAINER_NOTIFY_DIR', 'run')
+SUPPORTED = hasattr(socket, 'AF_UNIX')
+MAX_MESSAGE_BYTES = 64 * 1024
+
+# Upload progress and status changes, published by workers
+STATUS_CHANNEL = 'status'
+# New uploads, published by the API so idle workers start right away
+UPLOADS_CHANNEL = 'uploads'
+# Cancelled uploads, published by the API so the worker running one stops right away
+CANCEL_CHANNEL = 'cancel'
+
+# Workers still poll in case a notification is lost (or can't be sent at all), backing off while idle
+POLL_MIN_SECONDS = float(os.getenv('EXPLAINER_POLL_MIN_SECONDS', '2'))
+POLL_MAX_SECONDS = float(os.getenv('EXPLAINER_POLL_MAX_SECONDS', '60' if SUPPORTED else '10'))
+
+
+def _channel_dir(channel: str) -> str:
+    return os.path.join(NOTIFY_DIR, channel)
+
+
+def publish(channel: str, message: dict):
+    """Fire-and-forget delivery to every live subscriber of the channel."""
+    if not SUPPORTED:
+        return
+    directory = _channel_dir(channel)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    payload = json.dumps(message).encode('utf-8')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+        sender.setblocking(False)
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                sender.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The subscriber died without cleaning up
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            except OSError as e:
+                # A full receive buffer only costs that subscriber one message; it falls back to polling
+                logging.debug(f"Dropped notification for {path}: {e}")
+
+
+class Subscription:
+    """Receives a channel's messages on a background thread and hands each one to callback(message)."""
+
+    def __init__(self, channel: str, callback):
+        self.callback = callback
+        self.path = None
+        self._socket = None
+        if not SUPPORTED:
+            return
+        directory = _channel_dir(channel)
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self.path)
+        self._socket.settimeout(1.0)  # So the thread notices close()
+        self._thread = threading.Thread(target=self._run, name=f"notify-{channel}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        sock = self._socket
+        while self._socket is not None:
+            try:
+                payload = sock.recv(MAX_MESSAGE_BYTES)
+            except socket.timeout:
+                continue
+            except OSError:
+                return  # Closed
+            try:
+                self.callback(json.loads(payload))
+            except Exception as e:
+                logging.error(f"Notification handler failed: {e}")
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class Broadcaster:
+    """Fans one channel's messages out to any number of in-process listeners, each with its own queue."""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._subscription = None
+        self._listeners = set()
+        self._lock = threading.Lock()
+
+    def _deliver(self, message):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener.put_nowait(message)
+            except queue.Full:
+                pass  # A stalled listener misses events rather than blocking everyone
+
+    def listen(self) -> queue.Queue:
+        listener = queue.Queue(maxsize=1000)
+        with self._lock:
+            if self._subscription is None:
+                self._subscription = Subscription(self.channel, self._deliver)
+            self._listeners.add(listener)
+        return listener
+
+    def unlisten(self, listener: queue.Queue):
+        with self._lock:
+            self._listeners.discard(listener)
+
+
+class AsyncWakeup:
+    """Lets an asyncio loop sleep until something is published on the channel."""
+
+    def __init__(self, channel: str):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._subscription = Subscription(channel, self._notify)
+
+    def _notify(self, message):
+        # Called on the subscription thread
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    async def wait(self, timeout: float = None) -> bool:
+        """True if woken by a message; messages that arrived while nobody was waiting count too."""
+        if not self._event.is_set():
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        self._event.clear()
+        return True
+
+    def close(self):
+        self._subscription.close()
+
+
+class PollBackoff:
+    """Fallback poll interval: doubles while polls find nothing, drops back once they do."""
+
+    def __init__(self, minimum: float = POLL_MIN_SECONDS, maximum: float = POLL_MAX_SECONDS):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.delay = minimum
+
+    def idle(self) -> float:
+        delay = self.delay
+        self.delay = min(self.maximum, self.delay * 2)
+        return delay
+
+    def reset(self):
+        self.delay = self.minimum
@@ -0,0 +1,127 @@
+import os
+import asyncio
+import zipfile
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree.ElementTree import iterparse, ParseError
+
+REQUIRED_PARTS = ('[Content_Types].xml', 'ppt/presentation.xml')
+
+PARSE_WORKERS = int(os.getenv('EXPLAINER_PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+R = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def count_slides(pptx_path) -> int:
+    # Counts the slide list in presentation.xml, the slides slide_part_names returns; media parts are never read
+    try:
+        with zipfile.ZipFile(pptx_path) as package, package.open('ppt/presentation.xml') as presentation:
+            return sum(1 for _, elem in iterparse(presentation) if elem.tag == f'{P}sldId')
+    except (zipfile.BadZipFile, KeyError, ParseError):
+        return None
+
+
+def is_presentation_package(path) -> bool:
+    try:
+        with zipfile.ZipFile(path) as package:
+            names = set(package.namelist())
+    except zipfile.BadZipFile:
+        return False
+    return all(part in names for part in REQUIRED_PARTS)
+
+
+def part_name(target: str) -> str:
+    # Targets are relative to ppt/, unless they are absolute (some writers emit /ppt/slides/...)
+    if target.startswith('/'):
+        return posixpath.normpath(target.lstrip('/'))
+    return posixpath.normpath(posixpath.join('ppt', target))
+
+
+def slide_part_names(package: zipfile.ZipFile) -> list:
+    """Slide part names in presentation order, which need not match their file numbering."""
+    targets = {}
+    with package.open('ppt/_rels/presentation.xml.rels') as rels:
+        for _, elem in iterparse(rels):
+            if elem.tag == f'{PKG_REL}Relationship':
+                targets[elem.get('Id')] = part_name(elem.get('Target'))
+
+    names = []
+    with package.open('ppt/presentation.xml') as presentation:
+        for _, elem in iterparse(presentation):
+            if elem.tag == f'{P}sldId':
+                names.append(targets[elem.get(f'{R}id')])
+    return names
+
+
+def extract_slide_text(stream) -> str:
+    """Same result as utils.combine_slide_text, read straight from a slide part's XML."""
+    shape_texts = []
+    paragraphs = []
+    paragraph = []
+    stack = []
+    in_shape = False
+
+    for event, elem in iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            # Only top-level text shapes count; python-pptx doesn't descend into groups either
+            if elem.tag == f'{P}sp' and stack and stack[-1] == f'{P}spTree':
+                in_shape = True
+                paragraphs = []
+            stack.append(elem.tag)
+            continue
+
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if in_shape:
+            if elem.tag == f'{A}t' and parent in (f'{A}r', f'{A}fld'):
+                paragraph.append(elem.text or '')
+            elif elem.tag == f'{A}br' and parent == f'{A}p':
+                paragraph.append('\v')
+            elif elem.tag == f'{A}p' and parent == f'{P}txBody':
+                paragraphs.append(''.join(paragraph))
+                paragraph = []
+            elif elem.tag == f'{P}sp' and parent == f'{P}spTree':
+                text = '\n'.join(paragraphs).strip()
+                if text:
+                    shape_texts.append(text)
+                in_shape = False
+        if parent == f'{P}spTree':
+            elem.clear()  # Keeps memory flat on slides with many shapes
+
+    return " ".join(shape_texts).replace('\n', ' ').replace('\r', '') if shape_texts else None
+
+
+def extract_deck_texts(pptx_path) -> list:
+    # Slide XML is decompressed as a stream; media parts are never read
+    with zipfile.ZipFile(pptx_path) as package:
+        texts = []
+        for name in slide_part_names(package):
+            with package.open(name) as slide:
+                texts.append(extract_slide_text(slide))
+        return texts
+
+
+_pool = None
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _pool
+
+
+async def extract_deck_texts_async(pptx_path, extractor=extract_deck_texts) -> list:
+    # Parsing is CPU-bound, so it runs in worker processes and never blocks the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_parse_pool(), extractor, pptx_path)
+
+
+def shutdown_parse_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
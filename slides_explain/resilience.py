@@ -0,0 +1,147 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from slides_explain.metrics import Counter
+
+MAX_ATTEMPTS = int(os.getenv('EXPLAINER_MAX_REQUEST_ATTEMPTS', '5'))
+BACKOFF_BASE_SECONDS = float(os.getenv('EXPLAINER_BACKOFF_BASE_SECONDS', '1'))
+BACKOFF_MAX_SECONDS = float(os.getenv('EXPLAINER_BACKOFF_MAX_SECONDS', '60'))
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('EXPLAINER_BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv('EXPLAINER_BREAKER_COOLDOWN_SECONDS', '30'))
+
+# Retries a single upload may spend across all of its slides
+RETRY_BUDGET_MIN = int(os.getenv('EXPLAINER_RETRY_BUDGET_MIN', '10'))
+RETRY_BUDGET_PER_SLIDE = float(os.getenv('EXPLAINER_RETRY_BUDGET_PER_SLIDE', '0.5'))
+
+
+class RetryableError(Exception):
+    """A failure worth retrying: rate limiting, a provider-side error or a network problem."""
+
+    def __init__(self, message, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(headers) -> float:
+    if headers.get('retry-after-ms'):
+        try:
+            return float(headers['retry-after-ms']) / 1000
+        except ValueError:
+            pass
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class RetryBudget:
+    def __init__(self, retries: int):
+        self.remaining = retries
+
+    def spend(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    @classmethod
+    def for_slides(cls, slide_count: int) -> 'RetryBudget':
+        return cls(max(RETRY_BUDGET_MIN, int(slide_count * RETRY_BUDGET_PER_SLIDE)))
+
+
+RETRIES = Counter('explainer_retries_total', 'Provider requests retried after a retryable failure.')
+
+# Set per upload by the worker; slide tasks started inside it share the same budget
+retry_budget = ContextVar('retry_budget', default=None)
+
+
+class CircuitBreaker:
+    """Stops all dispatch after repeated provider failures, then lets a single probe test recovery."""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_until = 0.0
+        self._probe_in_flight = False
+
+    async def wait(self):
+        while True:
+            if self.state == 'closed':
+                return
+            now = time.monotonic()
+            if now < self.opened_until:
+                await asyncio.sleep(self.opened_until - now)
+                continue
+            if not self._probe_in_flight:
+                self.state = 'half_open'
+                self._probe_in_flight = True
+                return
+            await asyncio.sleep(min(1.0, self.cooldown))
+
+    def record_success(self):
+        if self.state != 'closed':
+            logging.info("Circuit breaker closed; provider is healthy again.")
+        self.state = 'closed'
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self, retry_after: float = None):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            pause = max(self.cooldown, retry_after or 0)
+            self.state = 'open'
+            self.opened_until = time.monotonic() + pause
+            self._probe_in_flight = False
+            logging.warning(f"Circuit breaker open after {self.failures} failures; pausing dispatch for {pause:.0f}s.")
+
+    def release_probe(self):
+        # A probe that ended without a verdict (e.g. cancelled) must not block everyone else
+        if self.state == 'half_open':
+            self._probe_in_flight = False
+
+
+async def call_with_retries(func, *args, breaker: CircuitBreaker = None, max_attempts: int = MAX_ATTEMPTS,
+                            **kwargs):
+    attempt = 0
+    while True:
+        try:
+            result = await func(*args, **kwargs)
+        except RetryableError as e:
+            if breaker is not None:
+                breaker.record_failure(e.retry_after)
+            attempt += 1
+            budget = retry_budget.get()
+            if attempt >= max_attempts or (budget is not None and not budget.spend()):
+                raise
+            RETRIES.inc()
+            delay = max(e.retry_after or 0, backoff_delay(attempt))
+            logging.warning(f"Retrying in {delay:.1f}s after attempt {attempt} failed: {e}")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            if breaker is not None:
+                breaker.release_probe()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
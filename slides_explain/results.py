@@ -0,0 +1,71 @@
+import os
+import gzip
+import json
+from slides_explain.storage import existing_path
+
+
+def partial_path(outputs_folder: str, uid: str) -> str:
+    return existing_path(outputs_folder, f"{uid}.jsonl")
+
+
+def result_path(outputs_folder: str, uid: str) -> str:
+    return existing_path(outputs_folder, f"{uid}.json")
+
+
+def compressed_path(path: str) -> str:
+    return f"{path}.gz"
+
+
+def _replace_atomically(path: str, data: bytes):
+    # Write then rename so a crash never leaves a half-written file behind
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.tmp", 'wb') as f:
+        f.write(data)
+    os.replace(f"{path}.tmp", path)
+
+
+def write_result(path: str, explanations: list):
+    """Write the final result, plus a gzip copy the API can send as-is to clients that accept it."""
+    data = json.dumps(explanations, indent=4).encode('utf-8')
+    # mtime=0 keeps the compressed bytes identical for identical results
+    _replace_atomically(compressed_path(path), gzip.compress(data, compresslevel=9, mtime=0))
+    _replace_atomically(path, data)
+
+
+def load_partial(path: str) -> dict:
+    """Map slide index to explanation for every slide already recorded in a partial results file."""
+    explanations = {}
+    if not os.path.exists(path):
+        return explanations
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # A crash mid-write leaves at most one truncated trailing line
+            explanations[record['index']] = record['explanation']
+    return explanations
+
+
+def count_partial(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb') as f:
+        return sum(1 for line in f if line.endswith(b'\n'))
+
+
+class PartialResultWriter:
+    """Appends one JSON line per finished slide and syncs it, so completed work survives a crash."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a')
+
+    def write(self, index: int, explanation: str):
+        self._file.write(json.dumps({'index': index, 'explanation': explanation}) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
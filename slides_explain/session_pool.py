@@ -0,0 +1,49 @@
+import os
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+from slides_explain.metrics import Counter, Gauge
+
+# Connection pool tuning, overridable per deployment
+POOL_LIMIT = int(os.getenv('EXPLAINER_POOL_LIMIT', '100'))
+POOL_LIMIT_PER_HOST = int(os.getenv('EXPLAINER_POOL_LIMIT_PER_HOST', '20'))
+DNS_CACHE_TTL = int(os.getenv('EXPLAINER_DNS_CACHE_TTL', '300'))
+KEEPALIVE_TIMEOUT = float(os.getenv('EXPLAINER_KEEPALIVE_TIMEOUT', '60'))
+REQUEST_TIMEOUT = ClientTimeout(total=float(os.getenv('EXPLAINER_REQUEST_TIMEOUT', '10')))
+
+
+POOL_CONNECTIONS = Counter('explainer_pool_connections_total',
+                           'Connections taken from the HTTP pool: newly opened or reused keep-alive ones.', ['kind'])
+POOL_LIMITS = Gauge('explainer_pool_connection_limit', 'Connection pool size, in total and per host.', ['scope'],
+                    function=lambda: {('total',): POOL_LIMIT, ('per_host',): POOL_LIMIT_PER_HOST})
+
+
+async def _connection_created(session, context, params):
+    POOL_CONNECTIONS.inc(kind='new')
+
+
+async def _connection_reused(session, context, params):
+    POOL_CONNECTIONS.inc(kind='reused')
+
+
+def create_session() -> ClientSession:
+    # Must be called inside the running event loop; close it with `await session.close()`
+    connector = TCPConnector(limit=POOL_LIMIT, limit_per_host=POOL_LIMIT_PER_HOST,
+                             ttl_dns_cache=DNS_CACHE_TTL, use_dns_cache=True,
+                             keepalive_timeout=KEEPALIVE_TIMEOUT)
+    # Connection reuse is counted through aiohttp's tracing hooks rather than the connector's internals
+    tracing = TraceConfig()
+    tracing.on_connection_create_end.append(_connection_created)
+    tracing.on_connection_reuseconn.append(_connection_reused)
+    return ClientSession(connector=connector, timeout=REQUEST_TIMEOUT, trace_configs=[tracing])
+
+
+def pool_stats(session: ClientSession) -> dict:
+    connector = session.connector
+    if connector is None:
+        return {'closed': True}
+    return {
+        'closed': connector.closed,
+        'limit': connector.limit,
+        'limit_per_host': connector.limit_per_host,
+        'new_connections': POOL_CONNECTIONS.value(kind='new'),
+        'reused_connections': POOL_CONNECTIONS.value(kind='reused'),
+    }
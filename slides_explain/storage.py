@@ -0,0 +1,42 @@
+import os
+import hashlib
+
+# uploads/ and outputs/ are split into 256 subdirectories so no single directory grows with the whole history
+SHARD_CHARS = 2
+CHANGE_LOG_NAME = 'changes.log'
+
+
+def shard_of(filename: str) -> str:
+    # Keyed on the name up to the first dot, so <uid>.pptx, <uid>.json and <uid>.jsonl share a shard
+    stem = filename.split('.', 1)[0]
+    return hashlib.sha1(stem.encode('utf-8')).hexdigest()[:SHARD_CHARS]
+
+
+def sharded_path(folder: str, filename: str, create: bool = False) -> str:
+    directory = os.path.join(folder, shard_of(filename))
+    if create:
+        os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def existing_path(folder: str, filename: str) -> str:
+    """Where a file lives: its shard, or the flat folder for files written before sharding."""
+    path = sharded_path(folder, filename)
+    legacy = os.path.join(folder, filename)
+    if not os.path.exists(path) and os.path.exists(legacy):
+        return legacy
+    return path
+
+
+def change_log_path(folder: str) -> str:
+    return os.path.join(folder, CHANGE_LOG_NAME)
+
+
+def record_change(folder: str, filename: str):
+    """Append a new file's name to the folder's change log, which the file-based worker reads incrementally."""
+    # A single short O_APPEND write lands in one piece even with several API processes appending at once
+    fd = os.open(change_log_path(folder), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, f"{filename}\n".encode('utf-8'))
+    finally:
+        os.close(fd)
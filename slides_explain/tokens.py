@@ -0,0 +1,63 @@
+import os
+import re
+
+# Slides whose text is estimated above this many tokens are explained in chunks of at most this size
+SLIDE_TOKEN_BUDGET = int(os.getenv('EXPLAINER_SLIDE_TOKEN_BUDGET', '1500'))
+# Text beyond this many chunks is dropped rather than explained
+MAX_CHUNKS_PER_SLIDE = int(os.getenv('EXPLAINER_MAX_CHUNKS_PER_SLIDE', '4'))
+# Sent as max_tokens; the provider charges its rate limits for it up front, so the dispatcher does too
+COMPLETION_TOKENS = int(os.getenv('EXPLAINER_COMPLETION_TOKENS', '500'))
+# Chat formatting adds a few tokens around every message
+MESSAGE_OVERHEAD_TOKENS = 7
+
+TOKEN_PIECE = re.compile(r'[A-Za-z]+|\d+|\s+|[^\sA-Za-z\d]')
+SENTENCE_END = re.compile(r'(?<=[.!?;:])\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate a BPE tokenizer: about four letters per token, three digits per token,
+    and one token for each punctuation mark or non-ASCII character."""
+    tokens = 0
+    for piece in TOKEN_PIECE.findall(text):
+        if piece.isspace():
+            continue
+        if piece.isdigit():
+            tokens += (len(piece) + 2) // 3
+        elif piece.isascii() and piece.isalpha():
+            tokens += (len(piece) + 3) // 4
+        else:
+            tokens += 1
+    return tokens
+
+
+def request_tokens(prompt: str, completion_tokens: int = COMPLETION_TOKENS) -> int:
+    # What one request costs against the tokens-per-minute budget
+    return estimate_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS + completion_tokens
+
+
+def _split_long_word(word: str, max_tokens: int) -> list:
+    # Worst case is one token per character
+    return [word[start:start + max_tokens] for start in range(0, len(word), max_tokens)]
+
+
+def split_into_chunks(text: str, max_tokens: int = SLIDE_TOKEN_BUDGET) -> list:
+    """Split text into chunks of at most max_tokens, breaking between sentences where possible."""
+    pieces = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        for word in sentence.split():
+            pieces.extend([word] if estimate_tokens(word) <= max_tokens else _split_long_word(word, max_tokens))
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(' '.join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
@@ -1,32 +1,176 @@
-from aiohttp import ClientSession, ClientTimeout
+import os
+import json
+import asyncio
+from functools import lru_cache
+from aiohttp import ClientSession, ClientError
+from pptx import Presentation
 import logging
+from slides_explain.cache import get_cache, cache_key
+from slides_explain.batching import SlideBatcher, BATCH_SLIDES, SHORT_SLIDE_TOKENS
+from slides_explain.dispatcher import get_dispatcher
+from slides_explain.tokens import (estimate_tokens, request_tokens, split_into_chunks, SLIDE_TOKEN_BUDGET,
+                                   MAX_CHUNKS_PER_SLIDE, COMPLETION_TOKENS)
+from slides_explain.resilience import RetryableError, call_with_retries, parse_retry_after
+from slides_explain.session_pool import REQUEST_TIMEOUT
+from slides_explain.metrics import ERRORS, TOKENS
 
 logging.basicConfig(filename='presentation_processing.log', level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-async def fetch_slide_explanation(session: ClientSession, slide_text: str, api_key: str) -> str:
-    prompt = f"Provide a concise explanation of the slide's content: {slide_text}"
-    headers = {
+MODEL = "gpt-3.5-turbo"
+# Point at an OpenAI-compatible server, e.g. the local mock in benchmarks/mock_llm.py
+API_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+CHAT_COMPLETIONS_URL = f"{API_BASE_URL.rstrip('/')}/chat/completions"
+PROMPT_TEMPLATE = "Provide a concise explanation of the slide's content: {slide_text}"
+BATCH_PROMPT_TEMPLATE = ("Provide a concise explanation of each slide's content. Reply with a JSON object "
+                         "whose keys are the slide numbers and whose values are the explanations.\n\n{slides}")
+CHUNK_PROMPT_TEMPLATE = ("This is part {part} of {parts} of a slide's text. "
+                         "Provide a concise explanation of this part: {slide_text}")
+
+
+@lru_cache(maxsize=8)
+def _auth_headers(api_key: str) -> dict:
+    return {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
+
+
+class ExplanationError(Exception):
+    pass
+
+
+class ProviderError(ExplanationError, RetryableError):
+    pass
+
+
+async def request_chat_completion(session: ClientSession, prompt: str, api_key: str, **options) -> str:
+    try:
+        return await _request_chat_completion(session, prompt, api_key, **options)
+    except ExplanationError as e:
+        ERRORS.inc(stage='api_call', error=type(e).__name__)
+        raise
+
+
+async def _request_chat_completion(session: ClientSession, prompt: str, api_key: str, **options) -> str:
+    headers = _auth_headers(api_key)
     data = {
-        "model": "gpt-3.5-turbo",
-        "messages": [{"role": "user", "content": prompt}]
+        "model": MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        **options
     }
-    timeout = ClientTimeout(total=10)
-    async with session.post("https://api.openai.com/v1/chat/completions", headers=headers, json=data,
-                            timeout=timeout) as response:
-        try:
-            result = await response.json()
+    try:
+        async with session.post(CHAT_COMPLETIONS_URL, headers=headers, json=data,
+                                timeout=REQUEST_TIMEOUT) as response:
+            try:
+                result = await response.json()
+            except Exception as e:
+                if response.status == 429 or response.status >= 500:
+                    raise ProviderError(f"Provider returned {response.status}",
+                                        retry_after=parse_retry_after(response.headers))
+                raise ExplanationError(f"Exception occurred: {e}")
             if 'choices' in result:
+                usage = result.get('usage') or {}
+                TOKENS.inc(usage.get('prompt_tokens', 0), kind='prompt')
+                TOKENS.inc(usage.get('completion_tokens', 0), kind='completion')
                 return result['choices'][0]['message']['content']
-            else:
-                logging.error(f"Error in response: {result}")
-                return f"Error in response: {result}"
-        except Exception as e:
-            logging.error(f"Exception occurred: {e}")
-            return f"Exception occurred: {e}"
+            if is_retryable_response(response.status, result):
+                raise ProviderError(f"Error in response: {result}", retry_after=parse_retry_after(response.headers))
+            raise ExplanationError(f"Error in response: {result}")
+    except (ClientError, asyncio.TimeoutError) as e:
+        raise ProviderError(f"Request failed: {e!r}")
+
+
+def is_retryable_response(status: int, result: dict) -> bool:
+    # An exhausted quota is also reported as 429, but waiting won't fix it
+    error = result.get('error') if isinstance(result, dict) else None
+    if isinstance(error, dict) and error.get('code') == 'insufficient_quota':
+        return False
+    return status == 429 or status >= 500
+
+
+async def request_slide_explanation(session: ClientSession, slide_text: str, api_key: str) -> str:
+    return await request_chat_completion(session, PROMPT_TEMPLATE.format(slide_text=slide_text), api_key,
+                                         max_tokens=COMPLETION_TOKENS)
+
+
+def batch_prompt(slide_texts: list) -> str:
+    slides = "\n\n".join(f"Slide {number}: {text}" for number, text in enumerate(slide_texts, 1))
+    return BATCH_PROMPT_TEMPLATE.format(slides=slides)
+
+
+async def request_batch_explanations(session: ClientSession, slide_texts: list, api_key: str) -> list:
+    content = await request_chat_completion(session, batch_prompt(slide_texts), api_key,
+                                            max_tokens=COMPLETION_TOKENS * len(slide_texts),
+                                            response_format={"type": "json_object"})
+    try:
+        explanations = json.loads(content)
+        split = [explanations[str(number)] for number in range(1, len(slide_texts) + 1)]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ExplanationError(f"Could not split batched response: {e}")
+    if not all(isinstance(explanation, str) and explanation.strip() for explanation in split):
+        raise ExplanationError("Batched response is missing explanations")
+    return split
+
+
+async def submit_batch(session: ClientSession, slide_texts: list, api_key: str) -> list:
+    dispatcher = get_dispatcher()
+    tokens = request_tokens(batch_prompt(slide_texts), COMPLETION_TOKENS * len(slide_texts))
+    return await call_with_retries(dispatcher.submit, request_batch_explanations, session, slide_texts, api_key,
+                                   tokens=tokens, breaker=dispatcher.breaker)
+
+
+async def submit_prompt(session: ClientSession, prompt: str, api_key: str) -> str:
+    dispatcher = get_dispatcher()
+    return await call_with_retries(dispatcher.submit, request_chat_completion, session, prompt, api_key,
+                                   max_tokens=COMPLETION_TOKENS, tokens=request_tokens(prompt),
+                                   breaker=dispatcher.breaker)
+
+
+async def submit_single(session: ClientSession, slide_text: str, api_key: str) -> str:
+    return await submit_prompt(session, PROMPT_TEMPLATE.format(slide_text=slide_text), api_key)
+
+
+async def submit_chunked(session: ClientSession, slide_text: str, api_key: str) -> str:
+    # Text-dense slides are explained part by part and the parts joined in order
+    chunks = split_into_chunks(slide_text, SLIDE_TOKEN_BUDGET)
+    if len(chunks) > MAX_CHUNKS_PER_SLIDE:
+        logging.warning(f"Slide text needs {len(chunks)} chunks; explaining only the first {MAX_CHUNKS_PER_SLIDE}.")
+        chunks = chunks[:MAX_CHUNKS_PER_SLIDE]
+    prompts = [CHUNK_PROMPT_TEMPLATE.format(part=number, parts=len(chunks), slide_text=chunk)
+               for number, chunk in enumerate(chunks, 1)]
+    explanations = await asyncio.gather(*[submit_prompt(session, prompt, api_key) for prompt in prompts])
+    return "\n\n".join(explanations)
+
+
+_batcher = None
+
+
+def get_batcher() -> SlideBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = SlideBatcher(submit_batch, submit_single, estimate_tokens)
+    return _batcher
+
+
+async def explain_slide_text(session: ClientSession, slide_text: str, api_key: str) -> str:
+    # Repeated slides are answered from the cache without touching the dispatcher budget
+    cache = get_cache()
+    key = cache_key(slide_text, MODEL, PROMPT_TEMPLATE)
+    explanation = await cache.lookup(key)
+    if explanation is not None:
+        return explanation
+
+    # Failures (after retries) raise ExplanationError and are never cached
+    tokens = estimate_tokens(slide_text)
+    if tokens > SLIDE_TOKEN_BUDGET:
+        explanation = await submit_chunked(session, slide_text, api_key)
+    elif BATCH_SLIDES and tokens <= SHORT_SLIDE_TOKENS:
+        explanation = await get_batcher().explain(session, slide_text, api_key)
+    else:
+        explanation = await submit_single(session, slide_text, api_key)
+    await cache.store(key, explanation)
+    return explanation
 
 
 def combine_slide_text(slide) -> str:
@@ -34,4 +178,9 @@ def combine_slide_text(slide) -> str:
     for shape in slide.shapes:
         if hasattr(shape, "text") and shape.text.strip():
             slide_text.append(shape.text.strip())
-    return " ".join(slide_text).replace('\n', ' ').replace('\r', '') if slide_text else None
\ No newline at end of file
+    return " ".join(slide_text).replace('\n', ' ').replace('\r', '') if slide_text else None
+
+
+def presentation_slide_texts(pptx_path) -> list:
+    # Full python-pptx object model; slower than slides_explain.ooxml but handles anything python-pptx can open
+    return [combine_slide_text(slide) for slide in Presentation(pptx_path).slides]
@@ -0,0 +1,140 @@
+# supervisor.py
+
+import os
+import sys
+import time
+import shutil
+import signal
+import logging
+import tempfile
+import threading
+import subprocess
+
+# Worker processes to run; 0 means one per core
+WORKERS = int(os.getenv('EXPLAINER_WORKERS', '0')) or os.cpu_count() or 1
+# Totals across all workers, divided between them; each worker would otherwise apply them on its own
+MAX_IN_FLIGHT = int(os.getenv('EXPLAINER_MAX_IN_FLIGHT', '8'))
+PARSE_WORKERS = int(os.getenv('EXPLAINER_PARSE_WORKERS', str(os.cpu_count() or 1)))
+# How long SIGTERM'd workers get to finish their running uploads before they are killed; unfinished ones
+# are picked up again from their partial results once their lease expires
+DRAIN_SECONDS = float(os.getenv('EXPLAINER_DRAIN_SECONDS', '120'))
+# Delay before restarting a crashed worker, doubling while it keeps crashing soon after starting
+RESTART_MIN_SECONDS = 1
+RESTART_MAX_SECONDS = 60
+# A worker that stayed up this long counts as healthy again
+STABLE_SECONDS = 60
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'explainer.py')
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('supervisor')
+
+
+class Supervisor:
+    """Runs a fixed number of explainer worker processes, restarts the ones that crash and drains them on stop.
+
+    Each worker has its own event loop and connection pool. Uploads are claimed under a lease, so workers never
+    process the same one; the provider budget is shared through EXPLAINER_SHARED_BUDGET_DIR.
+    """
+
+    def __init__(self, workers: int = WORKERS, command=None, drain_seconds: float = DRAIN_SECONDS,
+                 restart_min_seconds: float = RESTART_MIN_SECONDS, max_in_flight: int = MAX_IN_FLIGHT,
+                 parse_workers: int = PARSE_WORKERS):
+        if workers > max_in_flight:
+            # Every worker needs at least one request slot, so more of them would exceed the cap
+            logger.warning(f"Running {max_in_flight} workers instead of {workers}: "
+                           f"EXPLAINER_MAX_IN_FLIGHT is {max_in_flight}.")
+            workers = max_in_flight
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.parse_workers = parse_workers
+        self.command = command or [sys.executable, WORKER_SCRIPT]
+        self.drain_seconds = drain_seconds
+        self.restart_min_seconds = restart_min_seconds
+        self.children = {}  # slot -> Popen
+        self.started_at = {}
+        self.restart_delay = {slot: restart_min_seconds for slot in range(workers)}
+        self.restart_at = {}
+        self.restarts = 0
+        self.budget_dir = None
+        self._stopping = threading.Event()
+
+    def child_environment(self, slot: int) -> dict:
+        env = dict(os.environ, EXPLAINER_SHARED_BUDGET_DIR=self.budget_dir)
+        # The in-flight cap and the parse pool are per process, so split them; the per-minute budgets are shared
+        env['EXPLAINER_MAX_IN_FLIGHT'] = str(self.share(self.max_in_flight, slot))
+        env['EXPLAINER_PARSE_WORKERS'] = str(max(1, self.share(self.parse_workers, slot)))
+        # Every worker needs its own metrics port
+        metrics_port = int(os.getenv('EXPLAINER_METRICS_PORT', '9100'))
+        env['EXPLAINER_METRICS_PORT'] = str(metrics_port + slot if metrics_port else 0)
+        return env
+
+    def share(self, total: int, slot: int) -> int:
+        # Slots get total // workers each and the first ones one more, so the shares add up to total
+        return total // self.workers + (1 if slot < total % self.workers else 0)
+
+    def start_child(self, slot: int):
+        self.children[slot] = subprocess.Popen(self.command, env=self.child_environment(slot))
+        self.started_at[slot] = time.monotonic()
+        logger.info(f"Started worker {slot} (pid {self.children[slot].pid}).")
+
+    def check_children(self):
+        now = time.monotonic()
+        for slot, child in list(self.children.items()):
+            code = child.poll()
+            if code is None:
+                if now - self.started_at[slot] >= STABLE_SECONDS:
+                    self.restart_delay[slot] = self.restart_min_seconds
+                continue
+            del self.children[slot]
+            delay = self.restart_delay[slot]
+            logger.error(f"Worker {slot} (pid {child.pid}) exited with code {code}, restarting in {delay:g}s.")
+            self.restart_at[slot] = now + delay
+            self.restart_delay[slot] = min(delay * 2, RESTART_MAX_SECONDS)
+        for slot, due in list(self.restart_at.items()):
+            if now >= due:
+                del self.restart_at[slot]
+                self.restarts += 1
+                self.start_child(slot)
+
+    def drain(self):
+        logger.info(f"Stopping {len(self.children)} worker(s), "
+                    f"waiting up to {self.drain_seconds:g}s for them to drain.")
+        for child in self.children.values():
+            child.send_signal(signal.SIGTERM)
+        deadline = time.monotonic() + self.drain_seconds
+        for slot, child in self.children.items():
+            try:
+                child.wait(timeout=max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning(f"Worker {slot} (pid {child.pid}) did not drain in time, killing it.")
+                child.kill()
+                child.wait()
+        self.children.clear()
+
+    def run(self):
+        self.budget_dir = tempfile.mkdtemp(prefix='explainer-budget-')
+        try:
+            for slot in range(self.workers):
+                self.start_child(slot)
+            while not self._stopping.wait(0.5):
+                self.check_children()
+            self.drain()
+        finally:
+            shutil.rmtree(self.budget_dir, ignore_errors=True)
+        logger.info("All workers stopped.")
+
+    def stop(self, *args):
+        self._stopping.set()
+
+
+def main():
+    supervisor = Supervisor()
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    logger.info(f"Supervising {supervisor.workers} explainer worker(s).")
+    supervisor.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import io
+import os
+import zipfile
+import importlib
+import pytest
+
+PRESENTATIONML = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+
+
+@pytest.fixture(scope='session')
+def workdir(tmp_path_factory):
+    # The app, worker and ORM create folders and databases relative to the working directory
+    path = tmp_path_factory.mktemp('workdir')
+    os.makedirs(os.path.join(path, 'db'))
+    previous = os.getcwd()
+    os.chdir(path)
+    yield path
+    os.chdir(previous)
+
+
+@pytest.fixture(scope='module')
+def app_module(workdir):
+    return importlib.import_module('web_API.app')
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    # No DNS in the test environment, so skip the email deliverability lookup
+    validate = app_module.validate_email
+    monkeypatch.setattr(app_module, 'validate_email', lambda email: validate(email, check_deliverability=False))
+    return app_module.app.test_client()
+
+
+def make_pptx(marker, slides=1):
+    # Just enough of an OOXML package to pass upload validation
+    # Fixed timestamps, so the same marker always gives the same bytes
+    def entry(name):
+        return zipfile.ZipInfo(name, date_time=(2024, 1, 1, 0, 0, 0))
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as package:
+        package.writestr(entry('[Content_Types].xml'), '<Types/>')
+        slide_ids = ''.join(f'<p:sldId id="{255 + number}"/>' for number in range(1, slides + 1))
+        package.writestr(entry('ppt/presentation.xml'),
+                         f'<p:presentation xmlns:p="{PRESENTATIONML}" id="{marker}">'
+                         f'<p:sldIdLst>{slide_ids}</p:sldIdLst></p:presentation>')
+        for number in range(1, slides + 1):
+            package.writestr(entry(f'ppt/slides/slide{number}.xml'), '<sld/>')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def worker(workdir, monkeypatch):
+    module = importlib.import_module('explainer')
+    os.makedirs(module.OUTPUTS_FOLDER, exist_ok=True)
+    requested = []
+
+    async def extract(path, extractor):
+        return module.slides_for_test[os.path.basename(path)]
+
+    async def explain(session, slide_text, api_key):
+        requested.append(slide_text)
+        return f"new: {slide_text}"
+
+    module.slides_for_test = {}
+    monkeypatch.setattr(module, 'extract_deck_texts_async', extract)
+    monkeypatch.setattr(module, 'explain_slide_text', explain)
+    module.requested = requested
+    return module
+
+
+def add_processing_upload(db, worker, user, uid, slides):
+    from db.orm import Upload
+    upload = Upload(uid=uid, filename='lecture.pptx', user=user, status='processing', worker_id=worker.WORKER_ID,
+                    slide_count=len(slides))
+    db.add(upload)
+    db.commit()
+    worker.slides_for_test[f"{uid}.pptx"] = slides
+    return upload
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+
+from slides_explain.batching import SlideBatcher
+
+
+def make_batcher(fail_batches=False):
+    calls = {'batch': [], 'single': []}
+
+    async def send_batch(session, texts, api_key):
+        calls['batch'].append(texts)
+        if fail_batches:
+            raise ValueError("unparseable response")
+        return [f"batched: {text}" for text in texts]
+
+    async def send_single(session, text, api_key):
+        calls['single'].append(text)
+        return f"single: {text}"
+
+    batcher = SlideBatcher(send_batch, send_single, estimate_tokens=len, token_budget=12, max_slides=10,
+                           window=0.01)
+    return batcher, calls
+
+
+@pytest.mark.asyncio
+async def test_short_slides_are_packed_up_to_the_token_budget():
+    batcher, calls = make_batcher()
+
+    results = await asyncio.gather(*[batcher.explain(None, text, 'key') for text in ['aaaa', 'bbbb', 'cccc', 'dddd']])
+
+    assert results == ['batched: aaaa', 'batched: bbbb', 'batched: cccc', 'single: dddd']
+    assert calls['batch'] == [['aaaa', 'bbbb', 'cccc']]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_falls_back_to_single_requests():
+    batcher, calls = make_batcher(fail_batches=True)
+
+    results = await asyncio.gather(batcher.explain(None, 'one', 'key'), batcher.explain(None, 'two', 'key'))
+
+    assert results == ['single: one', 'single: two']
+    assert calls['single'] == ['one', 'two']
+
+
+@pytest.mark.asyncio
+async def test_cancelling_every_slide_of_a_batch_cancels_its_request():
+    started, aborted = asyncio.Event(), []
+
+    async def send_batch(session, texts, api_key):
+        started.set()
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            aborted.append(texts)
+            raise
+
+    async def send_single(session, text, api_key):
+        return f"single: {text}"
+
+    batcher = SlideBatcher(send_batch, send_single, estimate_tokens=len, token_budget=100, window=0.01)
+    slides = [asyncio.ensure_future(batcher.explain(None, text, 'key')) for text in ('one', 'two')]
+    await asyncio.wait_for(started.wait(), 1)
+    # Not sent yet, so it is simply dropped
+    waiting = asyncio.ensure_future(batcher.explain(None, 'three', 'key'))
+    await asyncio.sleep(0)
+    waiting.cancel()
+
+    for slide in slides:
+        slide.cancel()
+    await asyncio.gather(*slides, waiting, return_exceptions=True)
+    await asyncio.sleep(0.05)
+
+    assert aborted == [['one', 'two']]
+    assert not batcher._sending and not batcher._pending and not batcher._timers
@@ -0,0 +1,34 @@
+import pytest
+from benchmarks.mock_llm import MockConfig, MockServer
+from benchmarks.run import percentile
+
+
+@pytest.mark.asyncio
+async def test_mock_server_answers_single_and_batched_requests(monkeypatch):
+    from aiohttp import ClientSession
+    from slides_explain import utils
+
+    with MockServer(MockConfig(latency_ms=0, response_words=5, seed=1)) as server:
+        monkeypatch.setattr(utils, 'CHAT_COMPLETIONS_URL', f"{server.base_url}/chat/completions")
+        async with ClientSession() as session:
+            single = await utils.request_slide_explanation(session, 'Queues', 'key')
+            batch = await utils.request_batch_explanations(session, ['Locks', 'Caches', 'Indexes'], 'key')
+
+    assert len(single.split()) == 5
+    assert len(batch) == 3 and all(batch)
+    assert server.stats['requests'] == 2
+
+
+@pytest.mark.asyncio
+async def test_mock_server_rate_limits_are_retryable(monkeypatch):
+    from aiohttp import ClientSession
+    from slides_explain import utils
+
+    with MockServer(MockConfig(latency_ms=0, rate_429=1.0, retry_after=2)) as server:
+        monkeypatch.setattr(utils, 'CHAT_COMPLETIONS_URL', f"{server.base_url}/chat/completions")
+        async with ClientSession() as session:
+            with pytest.raises(utils.ProviderError) as error:
+                await utils.request_slide_explanation(session, 'Queues', 'key')
+
+    assert error.value.retry_after == 2
+    assert percentile([3, 1, 2, 4], 50) == 2 and percentile([3, 1, 2, 4], 99) == 4
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import pytest
+
+from slides_explain.cache import ExplanationCache, cache_key
+
+
+def test_cache_key_ignores_whitespace_but_not_model():
+    key = cache_key("Agenda\n  Intro", "gpt-3.5-turbo", "Explain: {slide_text}")
+
+    assert key == cache_key(" Agenda Intro ", "gpt-3.5-turbo", "Explain: {slide_text}")
+    assert key != cache_key("Agenda Intro", "gpt-4", "Explain: {slide_text}")
+
+
+def test_cache_persists_to_disk_and_counts_hits(tmp_path):
+    path = os.path.join(tmp_path, 'cache.db')
+    cache = ExplanationCache(path=path, memory_entries=1)
+    cache.set('a', 'first')
+    cache.set('b', 'second')  # pushes 'a' out of the memory tier
+
+    assert cache.get('a') == 'first'
+    assert cache.get('missing') is None
+    assert cache.stats['disk_hits'] == 1 and cache.stats['misses'] == 1
+    cache.close()
+
+    reopened = ExplanationCache(path=path)
+    assert reopened.get('b') == 'second'
+    reopened.close()
+
+
+def test_cache_evicts_expired_and_oversized_entries(tmp_path):
+    cache = ExplanationCache(path=os.path.join(tmp_path, 'cache.db'), max_bytes=10, ttl_seconds=3600)
+    cache.set('old', 'x' * 8)
+    cache.set('new', 'y' * 8)
+    cache.evict()
+
+    cache._memory.clear()
+    assert cache.get('old') is None
+    assert cache.get('new') == 'y' * 8
+    assert cache.stats['evictions'] == 1
+    cache.close()
+
+
+def test_cache_falls_back_to_memory_when_the_disk_tier_fails(tmp_path):
+    from slides_explain.metrics import ERRORS
+
+    path = os.path.join(tmp_path, 'cache.db')
+    cache = ExplanationCache(path=path, busy_timeout=0)
+    cache.set('a', 'first')
+    # Another worker holds the write lock on the shared database
+    other = sqlite3.connect(path, timeout=0)
+    other.execute('BEGIN EXCLUSIVE')
+    before = ERRORS.value(stage='cache', error='OperationalError')
+
+    cache.set('b', 'second')
+    cache._memory.clear()
+    # WAL lets reads through while the other worker writes; only the write is lost
+    assert cache.get('a') == 'first' and cache.get('b') is None
+    assert ERRORS.value(stage='cache', error='OperationalError') > before
+
+    cache.set('c', 'third')
+    assert cache.get('c') == 'third'
+    other.rollback()
+    other.close()
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_runs_disk_io_off_the_event_loop_and_batches_access_times(tmp_path):
+    path = os.path.join(tmp_path, 'cache.db')
+    cache = ExplanationCache(path=path, memory_entries=1)
+    await cache.store('a', 'first')
+    await cache.store('b', 'second')
+    written = sqlite3.connect(path).execute('SELECT accessed_at FROM explanations WHERE key = ?', ('a',)).fetchone()
+
+    assert await cache.lookup('a') == 'first'
+    assert await cache.lookup('missing') is None
+    assert cache.stats['disk_hits'] == 1 and cache.stats['misses'] == 1
+    assert sqlite3.connect(path).execute('SELECT accessed_at FROM explanations WHERE key = ?',
+                                         ('a',)).fetchone() == written
+    cache.close()
+    assert sqlite3.connect(path).execute('SELECT accessed_at FROM explanations WHERE key = ?',
+                                         ('a',)).fetchone() > written
@@ -0,0 +1,110 @@
+import json
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from slides_explain.results import load_partial, partial_path, result_path
+from conftest import add_processing_upload
+
+
+def slow_for(slow_texts, cancelled):
+    async def explain(session, slide_text, api_key):
+        try:
+            if slide_text in slow_texts:
+                await asyncio.sleep(30)
+            return f"new: {slide_text}"
+        except asyncio.CancelledError:
+            cancelled.append(slide_text)
+            raise
+    return explain
+
+
+@pytest.mark.asyncio
+async def test_deadline_skips_remaining_slides_and_keeps_finished_ones(worker, monkeypatch):
+    from aiohttp import ClientSession
+    from db.orm import SessionLocal, User, Upload
+
+    cancelled = []
+    monkeypatch.setattr(worker, 'explain_slide_text', slow_for({'Long tail'}, cancelled))
+    monkeypatch.setattr(worker, 'UPLOAD_DEADLINE_SECONDS', 0.3)
+    session = ClientSession()
+    db = SessionLocal()
+    user = User(email='deadline@example.com')
+    upload = add_processing_upload(db, worker, user, 'over-time', ['Intro', 'Long tail', 'Summary'])
+    await worker.process_upload(db, upload, session)
+
+    with open(result_path(worker.OUTPUTS_FOLDER, 'over-time')) as f:
+        explanations = json.load(f)
+    db.expire_all()
+    upload = db.query(Upload).filter(Upload.uid == 'over-time').one()
+
+    assert explanations == ['new: Intro', worker.SKIPPED_EXPLANATION, 'new: Summary']
+    assert cancelled == ['Long tail']
+    assert upload.status == 'partial' and '1 slide(s) skipped' in upload.error_message
+    assert upload.slides_completed == 2
+    # Finished slides stay available slide by slide
+    assert load_partial(partial_path(worker.OUTPUTS_FOLDER, 'over-time')) == {0: 'new: Intro', 2: 'new: Summary'}
+
+    # A retried attempt does not get a fresh deadline
+    retried = add_processing_upload(db, worker, user, 'retried', ['Intro again', 'Summary again'])
+    retried.started_time = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    await worker.process_upload(db, retried, session)
+    await session.close()
+    db.expire_all()
+
+    assert db.query(Upload).filter(Upload.uid == 'retried').one().status == 'partial'
+    assert load_partial(partial_path(worker.OUTPUTS_FOLDER, 'retried')) == {}
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_revision_of_a_deck_that_ran_out_of_time_explains_skipped_slides(worker, monkeypatch):
+    from aiohttp import ClientSession
+    from db.orm import SessionLocal, User
+
+    explain = worker.explain_slide_text
+    monkeypatch.setattr(worker, 'explain_slide_text', slow_for({'Long tail'}, []))
+    monkeypatch.setattr(worker, 'UPLOAD_DEADLINE_SECONDS', 0.3)
+    session = ClientSession()
+    db = SessionLocal()
+    user = User(email='revised-after-deadline@example.com')
+    first = add_processing_upload(db, worker, user, 'deck-v1', ['Intro', 'Long tail', 'Summary'])
+    await worker.process_upload(db, first, session)
+
+    monkeypatch.setattr(worker, 'explain_slide_text', explain)
+    monkeypatch.setattr(worker, 'UPLOAD_DEADLINE_SECONDS', 0)
+    worker.requested.clear()
+    revised = add_processing_upload(db, worker, user, 'deck-v2', ['Intro', 'Long tail', 'Summary', 'New'])
+    await worker.process_upload(db, revised, session)
+    await session.close()
+    db.close()
+
+    with open(result_path(worker.OUTPUTS_FOLDER, 'deck-v2')) as f:
+        explanations = json.load(f)
+    assert explanations == ['new: Intro', 'new: Long tail', 'new: Summary', 'new: New']
+    assert 'Long tail' in worker.requested
+
+
+@pytest.mark.asyncio
+async def test_cancelling_an_upload_stops_its_outstanding_slides(worker, monkeypatch):
+    from aiohttp import ClientSession
+    from db.orm import SessionLocal, User
+
+    cancelled = []
+    monkeypatch.setattr(worker, 'explain_slide_text', slow_for({'Slow one', 'Slow two'}, cancelled))
+    session = ClientSession()
+    # The worker hands claimed uploads to their task detached, like this one
+    db = SessionLocal(expire_on_commit=False)
+    upload = add_processing_upload(db, worker, User(email='cancel@example.com'), 'mistaken',
+                                   ['Quick', 'Slow one', 'Slow two'])
+    db.close()
+
+    task = asyncio.ensure_future(worker.process_claimed_upload(upload, session))
+    await asyncio.sleep(0.2)
+    worker.stop_upload(task, upload.id, 'cancelled')
+    await asyncio.wait_for(task, 2)
+    await session.close()
+
+    assert sorted(cancelled) == ['Slow one', 'Slow two']
+    assert load_partial(partial_path(worker.OUTPUTS_FOLDER, 'mistaken')) == {0: 'new: Quick'}
+    assert upload.id not in worker.stop_reasons
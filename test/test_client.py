@@ -0,0 +1,54 @@
+import io
+import importlib
+from conftest import make_pptx
+
+
+def test_streamed_multipart_body_is_accepted_by_the_api(client, tmp_path):
+    module = importlib.import_module('Client.client')
+    path = tmp_path / 'streamed.pptx'
+    path.write_bytes(make_pptx('streamed', slides=3))
+
+    body = module.MultipartStream(str(path), {'email': 'streamer@example.com'})
+    payload = b''
+    while chunk := body.read(1000):
+        payload += chunk
+    body.close()
+
+    assert len(payload) == len(body)
+    response = client.post('/upload', data=io.BytesIO(payload), content_type=body.content_type)
+    assert response.status_code == 200
+    status = client.get('/status', query_string={'uid': response.json['uid']}).json
+    assert status['filename'] == 'streamed.pptx'
+    assert status['slides_total'] == 3
+
+
+def test_bulk_upload_skips_files_in_the_manifest(tmp_path, monkeypatch):
+    module = importlib.import_module('Client.client')
+    for name in ('a.pptx', 'b.pptx'):
+        (tmp_path / name).write_bytes(make_pptx(name))
+    sent = []
+    monkeypatch.setattr(module, 'send_upload',
+                        lambda path, email, session: sent.append(path) or {'uid': f'uid-{len(sent)}'})
+
+    module.bulk_upload(str(tmp_path), parallelism=2)
+    module.bulk_upload(str(tmp_path), parallelism=2)
+
+    assert len(sent) == 2
+    manifest = module.load_manifest(str(tmp_path / module.MANIFEST_NAME))
+    assert sorted(entry['uid'] for entry in manifest.values()) == ['uid-1', 'uid-2']
+
+
+def test_upload_reports_http_errors_as_such(tmp_path, monkeypatch, capsys):
+    import requests
+    module = importlib.import_module('Client.client')
+    rejected = requests.Response()
+    rejected.status_code = 413
+    rejected._content = b'{"error": "too big"}'
+
+    def send(path, email):
+        raise requests.exceptions.HTTPError(response=rejected)
+    monkeypatch.setattr(module, 'send_upload', send)
+
+    assert module.upload_file(str(tmp_path / 'big.pptx')) is None
+    output = capsys.readouterr().out
+    assert 'Status Code: 413' in output and 'Error opening file' not in output
@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+
+from slides_explain.dispatcher import SlideDispatcher, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_keeps_slide_order_and_caps_in_flight():
+    dispatcher = SlideDispatcher(max_in_flight=3, requests_per_minute=6000, tokens_per_minute=10 ** 6)
+    peak = 0
+
+    async def explain(index):
+        nonlocal peak
+        peak = max(peak, dispatcher.in_flight)
+        await asyncio.sleep(0.01 * (10 - index))
+        return f"slide {index}"
+
+    results = await dispatcher.map(explain, range(10))
+
+    assert results == [f"slide {i}" for i in range(10)]
+    assert peak <= 3
+    assert dispatcher.in_flight == 0 and dispatcher.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=600, capacity=1)  # 10 tokens per second
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    await bucket.acquire()
+    await bucket.acquire()
+    elapsed = loop.time() - start
+
+    assert elapsed >= 0.09
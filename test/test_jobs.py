@@ -0,0 +1,81 @@
+import importlib
+from datetime import datetime, timedelta
+import pytest
+
+
+@pytest.fixture
+def db(workdir):
+    orm = importlib.import_module('db.orm')
+    session = orm.SessionLocal()
+    session.query(orm.Upload).delete()
+    session.commit()
+    yield session
+    session.close()
+
+
+def add_upload(db, uid):
+    from db.orm import Upload
+    upload = Upload(uid=uid, filename=f"{uid}.pptx")
+    db.add(upload)
+    db.commit()
+    return upload
+
+
+def test_each_upload_is_claimed_by_one_worker(db):
+    from db.jobs import claim_upload
+
+    add_upload(db, 'only-one')
+
+    first = claim_upload(db, 'worker-a')
+    second = claim_upload(db, 'worker-b')
+
+    assert first.uid == 'only-one' and first.status == 'processing' and first.worker_id == 'worker-a'
+    assert second is None
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_cannot_finish(db):
+    from db.jobs import claim_upload, heartbeat, finish_upload
+
+    add_upload(db, 'abandoned')
+    upload = claim_upload(db, 'worker-a')
+    upload.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+
+    reclaimed = claim_upload(db, 'worker-b')
+
+    assert reclaimed.uid == 'abandoned' and reclaimed.attempts == 2
+    assert not heartbeat(db, reclaimed.id, 'worker-a')
+    assert not finish_upload(db, reclaimed, 'worker-a')
+    assert finish_upload(db, reclaimed, 'worker-b')
+
+
+def test_released_upload_waits_out_the_provider_and_keeps_its_attempts(db):
+    from db.jobs import claim_upload, release_upload, MAX_ATTEMPTS
+
+    add_upload(db, 'rate-limited')
+    upload = claim_upload(db, 'worker-a')
+    assert release_upload(db, upload, 'worker-a', error_message='429', delay_seconds=30)
+    assert claim_upload(db, 'worker-b') is None
+
+    for _ in range(MAX_ATTEMPTS + 1):
+        upload.not_before = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        upload = claim_upload(db, 'worker-b')
+        assert upload.status == 'processing' and upload.attempts == 1
+        release_upload(db, upload, 'worker-b', delay_seconds=30)
+
+
+def test_fair_order_prefers_idle_users_then_small_decks(workdir):
+    from db.jobs import fair_order
+
+    now = datetime.utcnow()
+    candidates = [
+        (1, 'busy', 1, 5, now),     # small, but its user already has an upload running
+        (2, 'idle', 1, 300, now),   # large deck from an idle user
+        (3, 'idle', 1, 10, now),    # small deck from an idle user
+        (4, 'heavy', 4, 20, now),   # busy user with a higher weight
+    ]
+
+    order = fair_order(candidates, {'busy': 1, 'heavy': 1}, now)
+
+    assert order == [3, 2, 4, 1]
@@ -0,0 +1,32 @@
+import os
+from slides_explain.manifest import UploadManifest
+from slides_explain.results import result_path, write_result
+from slides_explain.storage import existing_path, record_change, sharded_path
+
+
+def test_manifest_bootstraps_once_then_follows_the_change_log(tmp_path):
+    uploads, outputs = str(tmp_path / 'uploads'), str(tmp_path / 'outputs')
+    os.makedirs(uploads)
+    # One deck from before sharding, one sharded deck that was already explained
+    open(os.path.join(uploads, 'legacy.pptx'), 'wb').close()
+    open(sharded_path(uploads, 'done.pptx', create=True), 'wb').close()
+    write_result(result_path(outputs, 'done'), ['explained'])
+    record_change(uploads, 'done.pptx')
+
+    manifest = UploadManifest(uploads, outputs)
+    assert manifest.pending() == ['legacy.pptx']
+    assert existing_path(uploads, 'legacy.pptx') == os.path.join(uploads, 'legacy.pptx')
+
+    open(sharded_path(uploads, 'new.pptx', create=True), 'wb').close()
+    record_change(uploads, 'new.pptx')
+    with open(os.path.join(uploads, 'changes.log'), 'a') as log:
+        log.write('half-writ')  # Not picked up until its newline lands
+    assert manifest.sync() == 1
+    manifest.mark('legacy.pptx', 'done')
+    manifest.close()
+
+    # State survives a restart without rescanning
+    reopened = UploadManifest(uploads, outputs)
+    assert reopened.pending() == ['new.pptx']
+    assert reopened.sync() == 0
+    reopened.close()
@@ -0,0 +1,61 @@
+import urllib.request
+import pytest
+from slides_explain.metrics import Counter, Gauge, Histogram, REGISTRY, render, start_metrics_server
+
+
+def test_metrics_render_in_prometheus_text_format():
+    requests = Counter('test_requests_total', 'Requests.', ['outcome'])
+    depth = Gauge('test_queue_depth', 'Queue depth.', function=lambda: 7)
+    latency = Histogram('test_latency_seconds', 'Latency.', ['stage'], buckets=(0.1, 1))
+    try:
+        requests.inc(outcome='ok')
+        requests.inc(2, outcome='ok')
+        latency.observe(0.05, stage='parse')
+        latency.observe(0.5, stage='parse')
+        latency.observe(5, stage='parse')
+
+        text = render()
+    finally:
+        for metric in (requests, depth, latency):
+            REGISTRY.remove(metric)
+
+    assert '# TYPE test_requests_total counter' in text
+    assert 'test_requests_total{outcome="ok"} 3' in text
+    assert 'test_queue_depth 7' in text
+    assert 'test_latency_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{stage="parse",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_sum{stage="parse"} 5.55' in text
+    assert 'test_latency_seconds_count{stage="parse"} 3' in text
+
+
+def test_worker_metrics_port_serves_the_registry():
+    server = start_metrics_server(port=19100, host='127.0.0.1')
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.server_port}/metrics') as response:
+            body = response.read().decode('utf-8')
+    finally:
+        server.shutdown()
+
+    assert '# TYPE explainer_stage_seconds histogram' in body
+
+
+@pytest.mark.asyncio
+async def test_connection_pool_reuse_is_exported(monkeypatch):
+    from benchmarks.mock_llm import MockConfig, MockServer
+    from slides_explain import utils
+    from slides_explain.session_pool import POOL_CONNECTIONS, create_session, pool_stats
+
+    before = {kind: POOL_CONNECTIONS.value(kind=kind) for kind in ('new', 'reused')}
+    with MockServer(MockConfig(latency_ms=0, response_words=5, seed=1)) as server:
+        monkeypatch.setattr(utils, 'CHAT_COMPLETIONS_URL', f"{server.base_url}/chat/completions")
+        session = create_session()
+        for _ in range(3):
+            await utils.request_slide_explanation(session, 'Queues', 'key')
+        stats = pool_stats(session)
+        await session.close()
+
+    assert POOL_CONNECTIONS.value(kind='new') - before['new'] == 1
+    assert POOL_CONNECTIONS.value(kind='reused') - before['reused'] == 2
+    assert stats['reused_connections'] == POOL_CONNECTIONS.value(kind='reused')
+    assert 'explainer_pool_connection_limit{scope="per_host"}' in render()
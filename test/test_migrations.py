@@ -0,0 +1,32 @@
+import sqlite3
+
+from sqlalchemy import inspect
+
+
+def test_legacy_setup_db_schema_is_upgraded(workdir, tmp_path):
+    from db.orm import Base, make_engine
+    from db.migrations import migrate, current_version, MIGRATIONS
+
+    # The schema the old db/setup_db.py used to create
+    path = tmp_path / 'legacy.db'
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE Users (id INTEGER PRIMARY KEY, email TEXT NOT NULL)')
+    conn.execute('CREATE TABLE Uploads (id INTEGER PRIMARY KEY, uid TEXT NOT NULL, filename TEXT NOT NULL, '
+                 'upload_time TEXT NOT NULL, finish_time TEXT, status TEXT NOT NULL, user_id INTEGER)')
+    conn.commit()
+    conn.close()
+
+    engine = make_engine(f'sqlite:///{path}')
+    migrate(engine, Base.metadata)
+    migrate(engine, Base.metadata)  # a second run is a no-op
+
+    inspector = inspect(engine)
+    columns = {column['name'] for column in inspector.get_columns('uploads')}
+    indexes = {index['name'] for index in inspector.get_indexes('uploads')}
+    with engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql('PRAGMA journal_mode').scalar()
+
+    assert {'error_message', 'content_hash', 'worker_id', 'lease_expires_at'} <= columns
+    assert 'ix_uploads_status_upload_time' in indexes
+    assert current_version(engine) == max(version for version, _, _ in MIGRATIONS)
+    assert journal_mode == 'wal'
@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+from slides_explain import notify
+
+
+@pytest.mark.asyncio
+async def test_wakeup_returns_as_soon_as_an_upload_is_announced(workdir):
+    if not notify.SUPPORTED:
+        pytest.skip('Unix datagram sockets are not available')
+    wakeup = notify.AsyncWakeup('test-uploads')
+    try:
+        assert not await wakeup.wait(0.05)
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, notify.publish, 'test-uploads', {'type': 'upload', 'uid': 'abc'})
+        started = loop.time()
+        assert await wakeup.wait(5)
+        assert loop.time() - started < 1
+
+        # An announcement that arrives while nobody is waiting is not lost
+        notify.publish('test-uploads', {'type': 'upload', 'uid': 'def'})
+        await asyncio.sleep(0.1)
+        assert await wakeup.wait(0)
+    finally:
+        wakeup.close()
+
+
+def test_poll_backoff_grows_while_idle_and_resets():
+    backoff = notify.PollBackoff(minimum=1, maximum=5)
+
+    assert [backoff.idle() for _ in range(5)] == [1, 2, 4, 5, 5]
+    backoff.reset()
+    assert backoff.idle() == 1
@@ -0,0 +1,67 @@
+import zipfile
+import pytest
+from pptx import Presentation
+from pptx.util import Inches
+
+from slides_explain.ooxml import count_slides, extract_deck_texts, extract_deck_texts_async, shutdown_parse_pool
+from slides_explain.utils import presentation_slide_texts
+
+
+@pytest.fixture
+def deck_path(tmp_path):
+    prs = Presentation()
+
+    slide = prs.slides.add_slide(prs.slide_layouts[1])
+    slide.shapes.title.text = "Weird   whitespace "
+    body = slide.placeholders[1].text_frame
+    body.text = "First paragraph\nSecond paragraph"
+    body.paragraphs[0].add_line_break()
+    body.paragraphs[0].add_run().text = "after a soft break"
+
+    prs.slides.add_slide(prs.slide_layouts[6])  # no text at all
+
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    group = slide.shapes.add_group_shape()
+    group.shapes.add_textbox(0, 0, Inches(1), Inches(1)).text = "inside a group"
+    slide.shapes.add_textbox(0, 0, Inches(1), Inches(1)).text = "  top level  "
+    slide.shapes.add_table(2, 2, 0, 0, Inches(2), Inches(2)).table.cell(0, 0).text = "table cell"
+
+    # Presentation order differs from the slideN.xml numbering
+    slide_ids = prs.slides._sldIdLst
+    last = slide_ids[-1]
+    slide_ids.remove(last)
+    slide_ids.insert(0, last)
+
+    path = str(tmp_path / 'deck.pptx')
+    prs.save(path)
+    return path
+
+
+def test_ooxml_extractor_matches_python_pptx(deck_path):
+    assert extract_deck_texts(deck_path) == presentation_slide_texts(deck_path)
+    assert count_slides(deck_path) == 3
+
+
+@pytest.mark.asyncio
+async def test_extraction_runs_in_process_pool(deck_path):
+    try:
+        texts = await extract_deck_texts_async(deck_path)
+    finally:
+        shutdown_parse_pool()
+
+    assert texts[0] == "top level"
+
+
+def test_absolute_slide_targets_and_orphan_slide_parts(deck_path, tmp_path):
+    # Some writers emit absolute relationship targets and leave unlisted slide parts in the package
+    rewritten = str(tmp_path / 'rewritten.pptx')
+    with zipfile.ZipFile(deck_path) as source, zipfile.ZipFile(rewritten, 'w') as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == 'ppt/_rels/presentation.xml.rels':
+                data = data.replace(b'Target="slides/', b'Target="/ppt/slides/')
+            target.writestr(item.filename, data)
+        target.writestr('ppt/slides/slide99.xml', source.read('ppt/slides/slide1.xml'))
+
+    assert extract_deck_texts(rewritten) == extract_deck_texts(deck_path)
+    assert count_slides(rewritten) == 3
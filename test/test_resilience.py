@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+
+from slides_explain.resilience import (CircuitBreaker, RetryableError, RetryBudget, call_with_retries,
+                                       parse_retry_after, retry_budget)
+
+
+def flaky(failures, retry_after=None):
+    calls = []
+
+    async def request():
+        calls.append(len(calls))
+        if len(calls) <= failures:
+            raise RetryableError("429 Too Many Requests", retry_after=retry_after)
+        return "explanation"
+
+    return request, calls
+
+
+def test_parse_retry_after_accepts_seconds_and_milliseconds():
+    assert parse_retry_after({'Retry-After': '3'}) == 3.0
+    assert parse_retry_after({'retry-after-ms': '250'}) == 0.25
+    assert parse_retry_after({}) is None
+
+
+@pytest.mark.asyncio
+async def test_retries_until_success_and_honors_retry_after(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(asyncio, 'sleep', fake_sleep)
+    request, calls = flaky(failures=2, retry_after=7)
+
+    assert await call_with_retries(request, max_attempts=5) == "explanation"
+    assert len(calls) == 3
+    assert all(delay >= 7 for delay in delays)
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_is_shared_and_stops_retries(monkeypatch):
+    async def fake_sleep(delay):
+        pass
+
+    monkeypatch.setattr(asyncio, 'sleep', fake_sleep)
+    request, calls = flaky(failures=10, retry_after=0)
+    retry_budget.set(RetryBudget(1))
+
+    with pytest.raises(RetryableError):
+        await call_with_retries(request, max_attempts=5)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_after_repeated_failures_and_probes_once_cooled_down():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    await breaker.wait()  # returns after the cooldown as the single probe
+    assert breaker.state == 'half_open'
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+@pytest.mark.asyncio
+async def test_cli_writes_no_result_when_a_slide_fails(tmp_path, monkeypatch):
+    from pptx import Presentation
+    from slides_explain import main as cli_main
+
+    prs = Presentation()
+    for text in ('Works', 'Provider is down'):
+        prs.slides.add_slide(prs.slide_layouts[1]).shapes.title.text = text
+    deck = tmp_path / 'deck.pptx'
+    prs.save(str(deck))
+
+    async def explain(session, slide_text, api_key):
+        if 'down' in slide_text:
+            raise RetryableError("503 Service Unavailable")
+        return "explanation"
+    monkeypatch.setattr(cli_main, 'explain_slide_text', explain)
+
+    with pytest.raises(RuntimeError, match='1 slide'):
+        await cli_main.main(str(deck), 'key')
+    assert not (tmp_path / 'deck.json').exists()
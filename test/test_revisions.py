@@ -0,0 +1,35 @@
+import json
+import pytest
+from slides_explain.results import result_path
+from conftest import add_processing_upload
+
+
+@pytest.mark.asyncio
+async def test_revised_deck_reuses_explanations_of_unchanged_slides(worker):
+    from aiohttp import ClientSession
+    from db.orm import SessionLocal, User, Upload
+    from db.revisions import reused_slides
+
+    session = ClientSession()
+    db = SessionLocal()
+    user = User(email='lecturer@example.com')
+    first = add_processing_upload(db, worker, user, 'lecture-v1', ['Intro', 'Queues   explained', 'Summary'])
+    await worker.process_upload(db, first, session)
+    worker.requested.clear()
+
+    revised = add_processing_upload(db, worker, user, 'lecture-v2',
+                                    ['Intro', 'Queues explained', 'Stacks explained', 'Summary v2', None])
+    await worker.process_upload(db, revised, session)
+    await session.close()
+
+    with open(result_path(worker.OUTPUTS_FOLDER, 'lecture-v2')) as f:
+        explanations = json.load(f)
+    db.expire_all()
+    revised = db.query(Upload).filter(Upload.uid == 'lecture-v2').one()
+
+    assert worker.requested == ['Stacks explained', 'Summary v2']
+    assert explanations == ['new: Intro', 'new: Queues   explained', 'new: Stacks explained', 'new: Summary v2',
+                            'No text content']
+    assert revised.status == 'done' and revised.slides_reused == 2 and revised.reused_from_id == first.id
+    assert reused_slides(db, revised.id) == {0, 1}
+    db.close()
@@ -63,22 +63,28 @@ async def test_end_to_end(web_api, explainer):
         result = response.json()
         assert 'uid' in result
         uid = result['uid']
-        status_url = f'http://localhost:5000/status?uid={uid}'
-        retries = 10
+        # Long-poll: each request returns as soon as the status changes, or after `wait` seconds
+        status_url = f'http://localhost:5000/status?uid={uid}&wait=30'
+        headers = {}
+        retries = 100  # Every progress event ends a long poll, so allow more rounds
         retry_delay = 10
         for attempt in range(retries):
             try:
-                response = requests.get(status_url)
+                response = requests.get(status_url, headers=headers)
+                if response.status_code == 304:
+                    continue
                 if response.status_code == 200:
+                    headers['If-None-Match'] = response.headers.get('ETag', '')
                     status = response.json()
                     if status['status'] == 'done':
-                        assert 'explanation' in status
-                        assert status['explanation'] is not None
+                        assert status['result_url'] == f'/result/{uid}'
+                        result = requests.get(f"http://localhost:5000{status['result_url']}")
+                        assert result.status_code == 200
+                        assert len(result.json()) == status['slides_total']
                         print(f"Processing complete after {attempt+1} attempts.")
                         break
-                    elif status['status'] == 'pending':
-                        print(f"Attempt {attempt+1}: Status is pending, retrying in {retry_delay} seconds...")
-                        time.sleep(retry_delay)
+                    elif status['status'] in ('pending', 'processing'):
+                        print(f"Attempt {attempt+1}: Status is {status['status']}, waiting for the next update...")
 
                     else:
                         print(f"Unexpected status: {status['status']}")
@@ -0,0 +1,62 @@
+import sys
+import time
+import threading
+from slides_explain.dispatcher import SharedTokenBucket
+from supervisor import Supervisor
+
+
+def test_shared_bucket_spends_one_budget_across_instances(tmp_path):
+    # Two instances on one file stand in for two worker processes
+    path = str(tmp_path / 'requests.bucket')
+    first = SharedTokenBucket(path, per_minute=60, capacity=2)
+    second = SharedTokenBucket(path, per_minute=60, capacity=2)
+
+    assert first._take(1) == 0
+    assert second._take(1) == 0
+    assert first._take(1) > 0
+    second.refund(1)
+    assert first._take(1) == 0
+
+
+def test_supervisor_restarts_crashed_workers_and_drains_on_stop(tmp_path):
+    marker = tmp_path / 'drained'
+    # Crashes on its first start, then runs until SIGTERM and exits cleanly
+    worker = (
+        "import os, sys, signal, time\n"
+        f"flag = {str(tmp_path / 'started')!r}\n"
+        "if not os.path.exists(flag):\n"
+        "    open(flag, 'w').close(); sys.exit(3)\n"
+        f"signal.signal(signal.SIGTERM, lambda *args: (open({str(marker)!r}, 'w').close(), sys.exit(0)))\n"
+        "while True: time.sleep(0.05)\n"
+    )
+    supervisor = Supervisor(workers=1, command=[sys.executable, '-c', worker], drain_seconds=10,
+                            restart_min_seconds=0.1)
+    thread = threading.Thread(target=supervisor.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while supervisor.restarts < 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.5)  # Let the restarted worker install its handler
+    finally:
+        supervisor.stop()
+        thread.join(timeout=15)
+
+    assert supervisor.restarts == 1
+    assert marker.exists()
+    assert not thread.is_alive() and not supervisor.children
+
+
+def test_supervisor_splits_the_in_flight_cap_and_parse_pool_between_workers(tmp_path):
+    supervisor = Supervisor(workers=16, max_in_flight=8, parse_workers=4)
+    supervisor.budget_dir = str(tmp_path)
+    environments = [supervisor.child_environment(slot) for slot in range(supervisor.workers)]
+
+    assert supervisor.workers == 8
+    assert sum(int(env['EXPLAINER_MAX_IN_FLIGHT']) for env in environments) == 8
+    assert [env['EXPLAINER_PARSE_WORKERS'] for env in environments] == ['1'] * 8
+
+    supervisor = Supervisor(workers=3, max_in_flight=8, parse_workers=4)
+    supervisor.budget_dir = str(tmp_path)
+    assert [supervisor.child_environment(slot)['EXPLAINER_MAX_IN_FLIGHT'] for slot in range(3)] == ['3', '3', '2']
+    assert [supervisor.child_environment(slot)['EXPLAINER_PARSE_WORKERS'] for slot in range(3)] == ['2', '1', '1']
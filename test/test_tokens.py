@@ -0,0 +1,47 @@
+import pytest
+from slides_explain.tokens import estimate_tokens, request_tokens, split_into_chunks, MESSAGE_OVERHEAD_TOKENS
+
+
+def test_estimate_tokens_counts_words_digits_and_symbols():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('The cat sat.') == 4
+    assert estimate_tokens('internationalization') == 5
+    assert estimate_tokens('2024') == 2
+    assert estimate_tokens('日本語') == 3
+    assert request_tokens('The cat sat.', completion_tokens=100) == 4 + MESSAGE_OVERHEAD_TOKENS + 100
+
+
+def test_long_text_is_split_between_sentences_within_budget():
+    sentences = [f"Point {number} is about caching layers." for number in range(40)]
+    text = ' '.join(sentences)
+
+    chunks = split_into_chunks(text, max_tokens=50)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+    assert ' '.join(chunks) == text
+
+    unbroken = split_into_chunks('x' * 300, max_tokens=10)
+    assert all(estimate_tokens(chunk) <= 10 for chunk in unbroken)
+    assert ''.join(unbroken).replace(' ', '') == 'x' * 300
+
+
+@pytest.mark.asyncio
+async def test_dense_slide_is_explained_chunk_by_chunk(monkeypatch, tmp_path):
+    from slides_explain import utils, cache
+
+    monkeypatch.setattr(cache, '_cache', cache.ExplanationCache(str(tmp_path / 'cache.db')))
+    monkeypatch.setattr(utils, 'SLIDE_TOKEN_BUDGET', 20)
+    prompts = []
+
+    async def submit_prompt(session, prompt, api_key):
+        prompts.append(prompt)
+        return f"explanation {len(prompts)}"
+
+    monkeypatch.setattr(utils, 'submit_prompt', submit_prompt)
+    text = ' '.join(f"Sentence number {number} explains queues." for number in range(6))
+
+    explanation = await utils.explain_slide_text(None, text, 'key')
+
+    assert len(prompts) > 1 and all(f"of {len(prompts)}" in prompt for prompt in prompts)
+    assert explanation == '\n\n'.join(f"explanation {number}" for number in range(1, len(prompts) + 1))
@@ -0,0 +1,257 @@
+import io
+import os
+import time
+import threading
+import pytest
+from conftest import make_pptx
+
+
+def upload(client, content, filename='deck.pptx', email=None):
+    data = {'file': (io.BytesIO(content), filename)}
+    if email:
+        data['email'] = email
+    return client.post('/upload', data=data, content_type='multipart/form-data')
+
+
+def test_duplicate_upload_reuses_existing_job(client):
+    first = upload(client, make_pptx('identical'), email='alice@example.com')
+    second = upload(client, make_pptx('identical'), filename='copy.pptx', email='alice@example.com')
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert second.json['uid'] == first.json['uid']
+    assert second.json['duplicate'] is True
+
+
+def test_identical_upload_from_someone_else_gets_its_own_job(client):
+    alice = upload(client, make_pptx('shared slides'), filename='alice.pptx', email='alice@example.com').json
+    bob = upload(client, make_pptx('shared slides'), filename='bob.pptx', email='bob@example.com').json
+    anonymous = upload(client, make_pptx('shared slides'), filename='anon.pptx').json
+
+    assert len({alice['uid'], bob['uid'], anonymous['uid']}) == 3
+    assert client.get(f"/status?uid={bob['uid']}").json['filename'] == 'bob.pptx'
+    assert [item['filename'] for item in client.get('/history?email=bob@example.com').json] == ['bob.pptx']
+
+
+def test_only_one_active_job_per_user_and_deck(workdir):
+    from sqlalchemy.exc import IntegrityError
+    from db.orm import SessionLocal, Upload, User
+
+    db = SessionLocal()
+    user = User(email='racer@example.com')
+    db.add_all([Upload(uid='race-1', filename='deck.pptx', content_hash='same', user=user),
+                Upload(uid='race-2', filename='deck.pptx', content_hash='same', user=user)])
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+    # A finished one doesn't block a new job
+    user = User(email='finished-racer@example.com')
+    db.add_all([Upload(uid='race-3', filename='deck.pptx', content_hash='same', user=user, status='done'),
+                Upload(uid='race-4', filename='deck.pptx', content_hash='same', user=user)])
+    db.commit()
+    db.close()
+
+
+def test_status_and_partial_result_report_slide_progress(client):
+    from slides_explain.results import PartialResultWriter, partial_path
+
+    uid = upload(client, make_pptx('in progress', slides=3)).json['uid']
+    writer = PartialResultWriter(partial_path('outputs', uid))
+    writer.write(1, 'second slide')
+    writer.write(0, 'first slide')
+    writer.close()
+
+    status = client.get(f'/status?uid={uid}').json
+    partial = client.get(f'/result/{uid}/partial').json
+
+    assert status['slides_completed'] == 2 and status['slides_total'] == 3
+    assert [item['explanation'] for item in partial['explanations']] == ['first slide', 'second slide']
+
+
+def test_upload_rejects_non_presentations_before_saving(client):
+    not_a_zip = upload(client, b'plain text pretending to be a deck')
+    wrong_extension = upload(client, make_pptx('pdf'), filename='deck.pdf')
+    zip_but_not_pptx = upload(client, b'PK\x03\x04' + b'\0' * 100)
+
+    assert not_a_zip.status_code == 400
+    assert wrong_extension.status_code == 400
+    assert zip_but_not_pptx.status_code == 400
+    assert not [name for _, _, names in os.walk('uploads') for name in names if name.endswith('.part')]
+
+
+def test_upload_enforces_size_limit(client):
+    limit = client.application.config['MAX_UPLOAD_BYTES']
+    client.application.config['MAX_UPLOAD_BYTES'] = 100
+    try:
+        response = upload(client, make_pptx('too big', slides=20))
+    finally:
+        client.application.config['MAX_UPLOAD_BYTES'] = limit
+
+    assert response.status_code == 413
+
+
+def test_history_pages_with_a_cursor_and_filters_by_status(client):
+    uids = [upload(client, make_pptx(f'history {n}'), email='pager@example.com').json['uid'] for n in range(5)]
+
+    first = client.get('/history?email=pager@example.com&limit=3')
+    second = client.get(f"/history?email=pager@example.com&limit=3&cursor={first.headers['X-Next-Cursor']}")
+    done_only = client.get('/history?email=pager@example.com&status=done')
+
+    assert [item['uid'] for item in first.json + second.json] == uids[::-1]
+    assert 'X-Next-Cursor' not in second.headers
+    assert done_only.json == []
+    assert client.get('/history?email=pager@example.com&cursor=garbage').status_code == 400
+
+
+def test_status_etag_and_long_poll_wakes_on_worker_event(client):
+    from db.orm import SessionLocal, Upload
+    from slides_explain.notify import publish, STATUS_CHANNEL
+
+    uid = upload(client, make_pptx('long poll')).json['uid']
+    first = client.get(f'/status?uid={uid}')
+    etag = first.headers['ETag']
+    assert client.get(f'/status?uid={uid}', headers={'If-None-Match': etag}).status_code == 304
+
+    def finish_later():
+        time.sleep(0.3)
+        db = SessionLocal()
+        db.query(Upload).filter(Upload.uid == uid).update({Upload.status: 'done'})
+        db.commit()
+        db.close()
+        publish(STATUS_CHANNEL, {'type': 'status', 'uid': uid, 'status': 'done'})
+
+    worker = threading.Thread(target=finish_later)
+    worker.start()
+    started = time.monotonic()
+    response = client.get(f'/status?uid={uid}&wait=10', headers={'If-None-Match': etag})
+    worker.join()
+
+    assert response.status_code == 200 and response.json['status'] == 'done'
+    assert time.monotonic() - started < 5
+
+
+def test_event_stream_sees_a_final_status_published_while_it_starts(client, app_module, monkeypatch):
+    uid = upload(client, make_pptx('finishes while subscribing')).json['uid']
+    load_status = app_module.load_status
+
+    def load_then_finish(*args):
+        # The worker finishes right after the snapshot was read
+        snapshot = load_status(*args)
+        app_module.status_events._deliver({'type': 'status', 'uid': uid, 'status': 'done'})
+        return snapshot
+
+    monkeypatch.setattr(app_module, 'load_status', load_then_finish)
+    body = client.get(f'/events?uid={uid}').get_data(as_text=True)
+
+    assert body.count('event: status') == 2 and '"status": "done"' in body
+    assert client.get('/events?uid=missing').status_code == 404
+    assert not app_module.status_events._listeners
+
+
+def test_batch_status_resolves_many_uids_at_once(client):
+    uids = [upload(client, make_pptx(f'batch {n}', slides=2)).json['uid'] for n in range(3)]
+
+    response = client.post('/status/batch', json={'uids': uids + ['missing']})
+
+    statuses = response.json['statuses']
+    assert response.status_code == 200
+    assert [statuses[uid]['status'] for uid in uids] == ['pending'] * 3
+    assert statuses[uids[0]]['slides_total'] == 2
+    assert statuses['missing'] is None
+    assert client.post('/status/batch', json={'uids': 'not a list'}).status_code == 400
+
+
+def test_metrics_endpoint_reports_request_and_stage_timings(client):
+    upload(client, make_pptx('metrics'))
+
+    response = client.get('/metrics')
+
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    assert 'explainer_http_request_seconds_count{endpoint="/upload",method="POST",status="200"}' in body
+    assert 'explainer_stage_seconds_count{stage="upload_receive"}' in body
+    assert 'explainer_uploads_received_total{outcome="accepted"}' in body
+
+
+def test_result_download_is_precompressed_conditional_and_sliceable(client, app_module):
+    import gzip
+    import json
+    from db.orm import SessionLocal, Upload
+    from slides_explain.results import write_result, result_path
+
+    uid = upload(client, make_pptx('finished', slides=3)).json['uid']
+    assert client.get(f'/result/{uid}').status_code == 409
+    write_result(result_path('outputs', uid), ['one', 'two', 'three'])
+    db = SessionLocal()
+    db.query(Upload).filter(Upload.uid == uid).update({Upload.status: 'done'})
+    db.commit()
+    db.close()
+
+    plain = client.get(f'/result/{uid}')
+    compressed = client.get(f'/result/{uid}', headers={'Accept-Encoding': 'gzip'})
+    revalidated = client.get(f'/result/{uid}', headers={'If-None-Match': plain.headers['ETag']})
+    partial = client.get(f'/result/{uid}', headers={'Range': 'bytes=0-9'})
+    sliced = client.get(f'/result/{uid}?slides=1,3')
+
+    assert plain.json == ['one', 'two', 'three']
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    refused = client.get(f'/result/{uid}', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert 'Content-Encoding' not in refused.headers and refused.json == ['one', 'two', 'three']
+    assert json.loads(gzip.decompress(compressed.get_data())) == ['one', 'two', 'three']
+    assert revalidated.status_code == 304
+    assert partial.status_code == 206 and partial.get_data() == plain.get_data()[:10]
+    assert sliced.json == [{'index': 0, 'explanation': 'one'}, {'index': 2, 'explanation': 'three'}]
+    assert client.get(f'/result/{uid}?slides=1,3', headers={'If-None-Match': sliced.headers['ETag']}).status_code == 304
+    assert client.get(f'/result/{uid}?slides=3-1').status_code == 400
+    assert client.get(f'/result/{uid}?slides=2-999999999').json == [{'index': 1, 'explanation': 'two'},
+                                                                    {'index': 2, 'explanation': 'three'}]
+    assert client.get(f'/result/{uid}?slides=' + ','.join(['1'] * 101)).status_code == 400
+    assert client.get(f'/status?uid={uid}').json['result_url'] == f'/result/{uid}'
+
+
+def test_cancel_stops_pending_uploads_only_once(client):
+    uid = upload(client, make_pptx('mistake', slides=5)).json['uid']
+
+    cancelled = client.delete(f'/upload/{uid}')
+    again = client.delete(f'/upload/{uid}')
+
+    assert cancelled.status_code == 200 and cancelled.json['status'] == 'cancelled'
+    assert client.get(f'/status?uid={uid}').json['status'] == 'cancelled'
+    assert again.status_code == 409
+    assert client.delete('/upload/missing').status_code == 404
+    # The same deck can be submitted again as a new job
+    assert upload(client, make_pptx('mistake', slides=5)).json['uid'] != uid
+
+
+def test_upload_that_ran_out_of_time_is_not_reused_for_the_same_bytes(client):
+    from db.orm import SessionLocal, Upload
+
+    uid = upload(client, make_pptx('ran out of time', slides=2), email='alice@example.com').json['uid']
+    db = SessionLocal()
+    db.query(Upload).filter(Upload.uid == uid).update({Upload.status: 'partial'})
+    db.commit()
+    db.close()
+
+    again = upload(client, make_pptx('ran out of time', slides=2), email='alice@example.com')
+
+    assert again.status_code == 200 and again.json['uid'] != uid
+
+
+def test_batch_status_reads_recorded_progress_instead_of_partial_files(client):
+    from db.orm import SessionLocal, Upload
+    from slides_explain.results import PartialResultWriter, partial_path
+
+    uid = upload(client, make_pptx('recorded progress', slides=4)).json['uid']
+    writer = PartialResultWriter(partial_path('outputs', uid))
+    writer.write(0, 'first slide')
+    writer.write(1, 'second slide')
+    writer.close()
+    db = SessionLocal()
+    db.query(Upload).filter(Upload.uid == uid).update({Upload.slides_completed: 1})
+    db.commit()
+    db.close()
+
+    batch = client.post('/status/batch', json={'uids': [uid]}).json['statuses'][uid]
+
+    assert batch['slides_completed'] == 1
+    assert client.get(f'/status?uid={uid}').json['slides_completed'] == 2
@@ -2,14 +2,27 @@
 
 import os
 import json
-from flask import Flask, request, jsonify
+import base64
+import binascii
+from urllib.parse import urlencode
+import time
+import queue
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 from datetime import datetime, timezone
 import uuid
+import hashlib
 import re
 from loguru import logger
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from db.orm import User, Upload, Base
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from db.orm import User, Upload, SessionLocal
+from db.jobs import cancel_upload
+from db.revisions import reused_slides
+from slides_explain.ooxml import count_slides, is_presentation_package
+from slides_explain.results import count_partial, load_partial, partial_path, result_path, compressed_path
+from slides_explain.storage import sharded_path, record_change
+from slides_explain.notify import Broadcaster, publish, STATUS_CHANNEL, UPLOADS_CHANNEL, CANCEL_CHANNEL
+from slides_explain.metrics import Counter, Histogram, STAGE_SECONDS, CONTENT_TYPE, render
 from werkzeug.utils import secure_filename
 from email_validator import validate_email, EmailNotValidError
 
@@ -20,6 +33,9 @@ OUTPUT_FOLDER = 'outputs'
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
+app.config['MAX_UPLOAD_BYTES'] = int(os.getenv('MAX_UPLOAD_BYTES', str(100 * 1024 * 1024)))
+# Werkzeug answers 413 before parsing bodies that are clearly too large; allow a little for form fields
+app.config['MAX_CONTENT_LENGTH'] = app.config['MAX_UPLOAD_BYTES'] + 64 * 1024
 
 # Ensure the uploads, outputs, and logs folders exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -34,13 +50,99 @@ os.makedirs(FLASK_APP_LOGS_FOLDER, exist_ok=True)
 # Configure logging with loguru
 logger.add(os.path.join(FLASK_APP_LOGS_FOLDER, 'flask_app.log'), rotation='1 day', retention='5 days', level='DEBUG')
 
-# Database setup
-DATABASE_URL = "sqlite:///db/chinook.db"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Database setup lives in db/orm.py (DATABASE_URL, engine tuning, migrations)
+
+
+# Worker progress/status events, fanned out to long-polling and SSE clients
+status_events = Broadcaster(STATUS_CHANNEL)
+FINAL_STATUSES = ('done', 'partial', 'failed', 'cancelled')
+# Uploads with a downloadable result; 'partial' ones ran out of time and have placeholders for skipped slides
+RESULT_STATUSES = ('done', 'partial')
+MAX_STATUS_WAIT_SECONDS = 60
+MAX_BATCH_STATUS_UIDS = 500
+SSE_KEEPALIVE_SECONDS = 15
+
+RESULT_MAX_AGE_SECONDS = 3600
+SLIDE_RANGE = re.compile(r'^(\d+)(?:-(\d+))?$')
+MAX_SLIDE_RANGES = 100
+
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 200
+
+# Uploads in these states are reused when the same user submits the same bytes again
+DEDUPLICATED_STATUSES = ('pending', 'processing', 'done')
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+ZIP_SIGNATURE = b'PK\x03\x04'
+
+HTTP_REQUEST_SECONDS = Histogram('explainer_http_request_seconds', 'API request latency.',
+                                 ['endpoint', 'method', 'status'])
+UPLOADS_RECEIVED = Counter('explainer_uploads_received_total', 'Upload requests by outcome.', ['outcome'])
+
+
+class UploadRejected(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def receive_upload(file, temp_path, max_bytes):
+    """Copy the upload to temp_path in fixed-size chunks, hashing and validating it on the way."""
+    first_chunk = file.stream.read(HASH_CHUNK_SIZE)
+    if not first_chunk.startswith(ZIP_SIGNATURE):
+        raise UploadRejected('File is not a .pptx presentation')
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, 'wb') as out:
+            chunk = first_chunk
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(f'File exceeds the {max_bytes} byte limit', 413)
+                digest.update(chunk)
+                out.write(chunk)
+                chunk = file.stream.read(HASH_CHUNK_SIZE)
+
+        if not is_presentation_package(temp_path):
+            raise UploadRejected('File is not a .pptx presentation')
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return digest.hexdigest()
+
+
+def slides_completed(upload, exact=True):
+    if upload.status == 'done':
+        return upload.slide_count
+    if not exact:
+        return upload.slides_completed or 0
+    return count_partial(partial_path(app.config['OUTPUT_FOLDER'], upload.uid))
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_time(response):
+    # Label by route pattern rather than path so uids don't each get their own series
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.get('request_started', time.perf_counter())
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method,
+                                 status=response.status_code)
+    return response
 
 
 # Routes
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(render(), content_type=CONTENT_TYPE)
+
+
 @app.route('/history', methods=['GET'])
 def get_history():
     try:
@@ -51,41 +153,92 @@ def get_history():
         if not email:
             return jsonify({'error': 'Email parameter is required'}), 400
 
-        db = SessionLocal()
-        user = db.query(User).filter(User.email == email).first()
-
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-
-        uploads = db.query(Upload).filter(Upload.user_id == user.id).all()
+        try:
+            limit = min(int(request.args.get('limit', HISTORY_DEFAULT_LIMIT)), HISTORY_MAX_LIMIT)
+            cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            return jsonify({'error': 'Invalid limit or cursor'}), 400
+        if limit < 1:
+            return jsonify({'error': 'Invalid limit or cursor'}), 400
+        statuses = [status for status in request.args.get('status', '').split(',') if status]
 
-        history = []
-        for upload in uploads:
-            timestamp = upload.upload_time.replace(tzinfo=timezone.utc).isoformat()
-            if upload.finish_time:
-                finish_time = upload.finish_time.replace(tzinfo=timezone.utc).isoformat()
-            else:
-                finish_time = None
-
-            upload_data = {
-                'uid': upload.uid,
-                'filename': upload.filename,
-                'upload_time': timestamp,
-                'finish_time': finish_time,
-                'status': upload.status,
-                'error_message': upload.error_message
-            }
-            history.append(upload_data)
-
-        db.close()
+        db = SessionLocal()
+        try:
+            user_id = db.query(User.id).filter(User.email == email).scalar()
+
+            if not user_id:
+                return jsonify({'error': 'User not found'}), 404
+
+            # Plain column tuples, newest first; (upload_time, id) is the keyset
+            query = db.query(Upload.id, Upload.uid, Upload.filename, Upload.upload_time, Upload.finish_time,
+                             Upload.status, Upload.error_message).filter(Upload.user_id == user_id)
+            if statuses:
+                query = query.filter(Upload.status.in_(statuses))
+            if cursor:
+                upload_time, upload_id = cursor
+                query = query.filter(or_(Upload.upload_time < upload_time,
+                                         and_(Upload.upload_time == upload_time, Upload.id < upload_id)))
+            rows = query.order_by(Upload.upload_time.desc(), Upload.id.desc()).limit(limit + 1).all()
+        finally:
+            db.close()
+
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].upload_time, rows[-1].id)
+            headers['X-Next-Cursor'] = next_cursor
+            headers['Link'] = f'<{request.base_url}?{urlencode(dict(request.args, cursor=next_cursor))}>; rel="next"'
 
         logger.info("History retrieved successfully.")
-        return jsonify(history), 200
+        return Response(stream_history(rows), status=200, headers=headers, mimetype='application/json')
     except Exception as e:
         error_msg = f"Failed to get history: {str(e)}"
         logger.error(error_msg)
         return jsonify({'error': f"Failed to get history: {str(e)}"}), 500
 
+
+def stream_history(rows):
+    # Serialize one row at a time rather than building the whole list first
+    yield '['
+    for position, row in enumerate(rows):
+        upload_data = {
+            'uid': row.uid,
+            'filename': row.filename,
+            'upload_time': row.upload_time.replace(tzinfo=timezone.utc).isoformat(),
+            'finish_time': row.finish_time.replace(tzinfo=timezone.utc).isoformat() if row.finish_time else None,
+            'status': row.status,
+            'error_message': row.error_message
+        }
+        yield (',' if position else '') + json.dumps(upload_data)
+    yield ']'
+
+
+def encode_cursor(upload_time, upload_id):
+    return base64.urlsafe_b64encode(f"{upload_time.isoformat()}|{upload_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        upload_time, upload_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(upload_time), int(upload_id)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def find_duplicate(db, user, content_hash):
+    if user is None:
+        return None
+    return db.query(Upload).filter(Upload.user_id == user.id, Upload.content_hash == content_hash,
+                                   Upload.status.in_(DEDUPLICATED_STATUSES)) \
+        .order_by(Upload.upload_time.desc()).first()
+
+
+def duplicate_response(existing, filename):
+    UPLOADS_RECEIVED.inc(outcome='duplicate')
+    logger.info(f"Upload {filename} matches existing upload {existing.uid}.")
+    return jsonify({'uid': existing.uid, 'status': existing.status, 'duplicate': True}), 200
+
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     try:
@@ -100,11 +253,9 @@ def upload_file():
             return jsonify({'error': 'No file provided in the request'}), 400
 
         filename = secure_filename(file.filename)
-        uid = str(uuid.uuid4())
-
-        # Save file with only UID in filename
-        new_filename = f"{uid}{os.path.splitext(filename)[1]}"
-        file.save(os.path.join(app.config['UPLOAD_FOLDER'], new_filename))
+        if not filename.lower().endswith('.pptx'):
+            logger.error(f"Rejected upload with unsupported file name: {filename}")
+            return jsonify({'error': 'Only .pptx files are supported'}), 400
 
         # Validate email if provided
         if email:
@@ -116,21 +267,63 @@ def upload_file():
                 logger.error(f"Invalid email provided: {str(e)}")
                 return jsonify({'error': 'Invalid email provided'}), 400
 
-        # Save upload details to database
+        uid = str(uuid.uuid4())
+
+        # Save file with only UID in filename; it only gets its final name once it has been validated
+        upload_path = sharded_path(app.config['UPLOAD_FOLDER'], f"{uid}.pptx", create=True)
+        temp_path = f"{upload_path}.part"
+        try:
+            with STAGE_SECONDS.time(stage='upload_receive'):
+                content_hash = receive_upload(file, temp_path, app.config['MAX_UPLOAD_BYTES'])
+        except UploadRejected as e:
+            logger.error(f"Rejected upload {filename}: {str(e)}")
+            UPLOADS_RECEIVED.inc(outcome='rejected')
+            return jsonify({'error': str(e)}), e.status_code
+
         db = SessionLocal()
-        upload = Upload(filename=filename, uid=uid)
+        user = db.query(User).filter(User.email == email).first() if email else None
+
+        # The same user's identical deck that is finished or still being worked on is reused as-is.
+        # Anonymous uploads are never matched: their uid is all that protects them.
+        with STAGE_SECONDS.time(stage='dedup_lookup'):
+            existing = find_duplicate(db, user, content_hash)
+        if existing:
+            db.close()
+            os.remove(temp_path)
+            return duplicate_response(existing, filename)
+
+        os.replace(temp_path, upload_path)
+
+        # Save upload details to database
+        upload = Upload(filename=filename, uid=uid, content_hash=content_hash,
+                        slide_count=count_slides(upload_path))
 
         if email:
-            user = db.query(User).filter(User.email == email).first()
             if not user:
                 user = User(email=email)
                 db.add(user)
             upload.user = user
 
         db.add(upload)
-        db.commit()
-        db.close()
-
+        try:
+            with STAGE_SECONDS.time(stage='db_commit'):
+                db.commit()
+        except IntegrityError:
+            # An identical upload from the same user was queued between our lookup and this commit
+            db.rollback()
+            existing = find_duplicate(db, user, content_hash) if user and user.id else None
+            if existing is None:
+                raise
+            os.remove(upload_path)
+            return duplicate_response(existing, filename)
+        finally:
+            db.close()
+
+        UPLOADS_RECEIVED.inc(outcome='accepted')
+        # The file-based worker reads new uploads from this log instead of listing the folder
+        record_change(app.config['UPLOAD_FOLDER'], f"{uid}.pptx")
+        # Idle workers wait on this instead of polling
+        publish(UPLOADS_CHANNEL, {'type': 'upload', 'uid': uid})
         logger.info("File uploaded successfully.")
         return jsonify({'uid': uid, 'status': 'File uploaded successfully'}), 200
     except Exception as e:
@@ -140,55 +333,353 @@ def upload_file():
 
 
 
+@app.route('/upload/<uid>', methods=['DELETE'])
+def cancel(uid):
+    try:
+        logger.info("Starting cancel function...")
+
+        db = SessionLocal()
+        try:
+            cancelled = cancel_upload(db, uid)
+            upload = db.query(Upload).filter(Upload.uid == uid).first()
+            response = status_payload(upload) if upload else None
+            user_id = upload.user_id if upload else None
+        finally:
+            db.close()
+
+        if response is None:
+            return jsonify({'error': 'No upload exists with the given uid'}), 404
+        if not cancelled:
+            return jsonify({'error': f"Upload is already {response['status']}", 'status': response['status']}), 409
+
+        # The worker running it cancels its outstanding slides; status watchers see the final state
+        publish(CANCEL_CHANNEL, {'type': 'cancel', 'uid': uid})
+        publish(STATUS_CHANNEL, {'type': 'status', 'uid': uid, 'user_id': user_id, 'status': 'cancelled'})
+        logger.info(f"Upload {uid} cancelled.")
+        return jsonify(response), 200
+    except Exception as e:
+        error_msg = f"Failed to cancel upload: {str(e)}"
+        logger.error(error_msg)
+        return jsonify({'error': error_msg}), 500
+
+
 @app.route('/status', methods=['GET'])
 def get_status():
+    listener = None
     try:
         logger.info("Starting get_status function...")
 
         uid = request.args.get('uid')
         email = request.args.get('email')
         filename = request.args.get('filename')
+        try:
+            wait = min(float(request.args.get('wait', 0)), MAX_STATUS_WAIT_SECONDS)
+        except ValueError:
+            return jsonify({'error': 'Invalid wait parameter'}), 400
 
-        db = SessionLocal()
+        if not uid and not (email and filename):
+            return jsonify({'error': 'Invalid parameters provided'}), 400
 
+        # Listen before reading so an update landing in between isn't missed
+        if wait > 0:
+            listener = status_events.listen()
+
+        response = load_status(uid, email, filename)
+        if response is None:
+            return jsonify({'status': 'not found', 'filename': None, 'timestamp': "Timestamp not found",
+                            'explanation': 'No upload exists with the given parameters'}), 404
+        etag = status_etag(response)
+
+        # Long poll: hold the request until a worker event changes the status, or the wait runs out
+        if wait > 0 and request.headers.get('If-None-Match') == etag and response['status'] not in FINAL_STATUSES:
+            deadline = time.monotonic() + wait
+            while True:
+                # Computed once: a negative timeout would make queue.get raise ValueError
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = listener.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if event.get('uid') != response['uid']:
+                    continue
+                response = load_status(response['uid'], None, None)
+                etag = status_etag(response)
+                if etag != request.headers.get('If-None-Match'):
+                    break
+
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=304, headers={'ETag': etag})
+
+        logger.info("Status retrieved successfully.")
+        return jsonify(response), 200, {'ETag': etag}
+    except Exception as e:
+        error_msg = f"Failed to get status: {str(e)}"
+        logger.error(error_msg)
+        return jsonify({'error': f"Failed to get status: {str(e)}"}), 500
+    finally:
+        if listener is not None:
+            status_events.unlisten(listener)
+
+
+def load_status(uid, email, filename):
+    db = SessionLocal()
+    try:
         if uid:
             upload = db.query(Upload).filter(Upload.uid == uid).first()
-        elif email and filename:
+        else:
             user = db.query(User).filter(User.email == email).first()
             if user:
                 upload = db.query(Upload).filter(Upload.user_id == user.id, Upload.filename == filename).order_by(
                     Upload.upload_time.desc()).first()
             else:
                 upload = None
+
+        if not upload:
+            return None
+        return status_payload(upload)
+    finally:
+        db.close()
+
+
+def status_payload(upload, exact_progress=True):
+    # Works for Upload objects and for column tuples with the same attribute names.
+    # exact_progress counts the worker's per-slide file instead of trusting the recorded progress.
+    timestamp = upload.upload_time.replace(tzinfo=timezone.utc).isoformat()
+    if upload.finish_time:
+        finish_time = upload.finish_time.replace(tzinfo=timezone.utc).isoformat()
+    else:
+        finish_time = None
+
+    return {
+        'uid': upload.uid,
+        'status': upload.status,
+        'filename': upload.filename,
+        'timestamp': timestamp,
+        'finish_time': finish_time,
+        'error_message': upload.error_message,
+        'slides_total': upload.slide_count,
+        'slides_completed': slides_completed(upload, exact_progress),
+        'slides_reused': upload.slides_reused or 0,
+        'result_url': f"/result/{upload.uid}" if upload.status in RESULT_STATUSES else None
+    }
+
+
+@app.route('/status/batch', methods=['POST'])
+def get_status_batch():
+    try:
+        logger.info("Starting get_status_batch function...")
+
+        body = request.get_json(silent=True) or {}
+        uids = body.get('uids')
+        if not isinstance(uids, list) or not all(isinstance(uid, str) for uid in uids):
+            return jsonify({'error': 'Body must be a JSON object with a list of uids'}), 400
+        if len(uids) > MAX_BATCH_STATUS_UIDS:
+            return jsonify({'error': f'At most {MAX_BATCH_STATUS_UIDS} uids per request'}), 400
+
+        db = SessionLocal()
+        try:
+            # One indexed IN query for the whole batch, selecting only what the payload needs
+            rows = db.query(Upload.uid, Upload.status, Upload.filename, Upload.upload_time, Upload.finish_time,
+                            Upload.error_message, Upload.slide_count, Upload.slides_completed, Upload.slides_reused) \
+                .filter(Upload.uid.in_(set(uids))).all()
+        finally:
+            db.close()
+
+        statuses = dict.fromkeys(uids)
+        for row in rows:
+            # Recorded progress, so the cost doesn't grow with the number of uploads in progress
+            statuses[row.uid] = status_payload(row, exact_progress=False)
+
+        logger.info(f"Batch status retrieved for {len(uids)} uids.")
+        return jsonify({'statuses': statuses}), 200
+    except Exception as e:
+        error_msg = f"Failed to get batch status: {str(e)}"
+        logger.error(error_msg)
+        return jsonify({'error': error_msg}), 500
+
+
+def status_etag(response):
+    return '"' + hashlib.sha1(json.dumps(response, sort_keys=True).encode()).hexdigest() + '"'
+
+
+@app.route('/events', methods=['GET'])
+def get_events():
+    """Server-Sent Events with progress and status changes for one upload (uid) or all of a user's (email)."""
+    logger.info("Starting get_events function...")
+
+    uid = request.args.get('uid')
+    email = request.args.get('email')
+    if not uid and not email:
+        return jsonify({'error': 'uid or email parameter is required'}), 400
+
+    # Listen before taking the snapshot so a final status published in between isn't missed
+    listener = status_events.listen()
+    try:
+        if uid:
+            snapshot = load_status(uid, None, None)
+            if snapshot is None:
+                status_events.unlisten(listener)
+                return jsonify({'error': 'No upload exists with the given uid'}), 404
+            user_id = None
         else:
-            return jsonify({'error': 'Invalid parameters provided'}), 400
+            db = SessionLocal()
+            try:
+                user_id = db.query(User.id).filter(User.email == email).scalar()
+            finally:
+                db.close()
+            if not user_id:
+                status_events.unlisten(listener)
+                return jsonify({'error': 'User not found'}), 404
+            snapshot = None
+    except Exception:
+        status_events.unlisten(listener)
+        raise
+
+    def stream():
+        try:
+            if snapshot is not None:
+                yield sse_message('status', snapshot)
+                if snapshot['status'] in FINAL_STATUSES:
+                    return
+            while True:
+                try:
+                    event = listener.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if (uid and event.get('uid') != uid) or (user_id and event.get('user_id') != user_id):
+                    continue
+                yield sse_message(event.get('type', 'status'), event)
+                if uid and event.get('status') in FINAL_STATUSES:
+                    return
+        finally:
+            status_events.unlisten(listener)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def sse_message(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/result/<uid>/partial', methods=['GET'])
+def get_partial_result(uid):
+    try:
+        logger.info("Starting get_partial_result function...")
+
+        db = SessionLocal()
+        try:
+            upload = db.query(Upload).filter(Upload.uid == uid).first()
+            reused = reused_slides(db, upload.id) if upload and upload.slides_reused else set()
+        finally:
+            db.close()
 
         if not upload:
-            return jsonify({'status': 'not found', 'filename': None, 'timestamp': "Timestamp not found",
-                            'explanation': 'No upload exists with the given parameters'}), 404
+            return jsonify({'error': 'No upload exists with the given uid'}), 404
 
-        timestamp = upload.upload_time.replace(tzinfo=timezone.utc).isoformat()
-        if upload.finish_time:
-            finish_time = upload.finish_time.replace(tzinfo=timezone.utc).isoformat()
+        if upload.status == 'done':
+            with open(result_path(app.config['OUTPUT_FOLDER'], uid)) as f:
+                explanations = dict(enumerate(json.load(f)))
         else:
-            finish_time = None
+            explanations = load_partial(partial_path(app.config['OUTPUT_FOLDER'], uid))
 
         response = {
             'status': upload.status,
-            'filename': upload.filename,
-            'timestamp': timestamp,
-            'finish_time': finish_time,
-            'error_message': upload.error_message
+            'slides_total': upload.slide_count,
+            'slides_completed': len(explanations),
+            'slides_reused': len(reused),
+            # reused marks slides whose explanation was carried over from an earlier version of the deck
+            'explanations': [{'index': index, 'explanation': text, 'reused': index in reused}
+                             for index, text in sorted(explanations.items())]
         }
 
-        db.close()
-
-        logger.info("Status retrieved successfully.")
+        logger.info("Partial result retrieved successfully.")
         return jsonify(response), 200
     except Exception as e:
-        error_msg = f"Failed to get status: {str(e)}"
+        error_msg = f"Failed to get partial result: {str(e)}"
         logger.error(error_msg)
-        return jsonify({'error': f"Failed to get status: {str(e)}"}), 500
+        return jsonify({'error': error_msg}), 500
+
+
+@app.route('/result/<uid>', methods=['GET'])
+def get_result(uid):
+    try:
+        logger.info("Starting get_result function...")
+
+        slides = request.args.get('slides')
+
+        db = SessionLocal()
+        try:
+            upload = db.query(Upload.status).filter(Upload.uid == uid).first()
+        finally:
+            db.close()
+
+        if not upload:
+            return jsonify({'error': 'No upload exists with the given uid'}), 404
+        if upload.status not in RESULT_STATUSES:
+            return jsonify({'error': f'The upload is {upload.status}; see /result/{uid}/partial for finished slides',
+                            'status': upload.status}), 409
+
+        path = result_path(app.config['OUTPUT_FOLDER'], uid)
+        if slides:
+            try:
+                return slide_slice_response(path, slides)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+        # The worker stores a gzip copy alongside the result; send it untouched when the client accepts it.
+        # send_file handles ETag/Last-Modified revalidation and range requests for either representation.
+        compressed = compressed_path(path)
+        if request.accept_encodings['gzip'] > 0 and os.path.exists(compressed):
+            response = send_file(os.path.abspath(compressed), mimetype='application/json', conditional=True,
+                                 max_age=RESULT_MAX_AGE_SECONDS)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = send_file(os.path.abspath(path), mimetype='application/json', conditional=True,
+                                 max_age=RESULT_MAX_AGE_SECONDS)
+        response.vary.add('Accept-Encoding')
+
+        logger.info("Result sent successfully.")
+        return response
+    except Exception as e:
+        error_msg = f"Failed to get result: {str(e)}"
+        logger.error(error_msg)
+        return jsonify({'error': error_msg}), 500
+
+
+def parse_slide_ranges(spec, slide_count):
+    """Turn '1-3,7' into the zero-based slide indexes {0, 1, 2, 6}, ignoring slides past slide_count."""
+    parts = spec.split(',')
+    if len(parts) > MAX_SLIDE_RANGES:
+        raise ValueError(f"Too many slide ranges; at most {MAX_SLIDE_RANGES} are allowed")
+    wanted = set()
+    for part in parts:
+        match = SLIDE_RANGE.match(part.strip())
+        if not match:
+            raise ValueError(f"Invalid slides parameter '{spec}'; use numbers and ranges like 1-3,7")
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid slide range '{part}'")
+        wanted.update(range(first - 1, min(last, slide_count)))
+    return wanted
+
+
+def slide_slice_response(path, spec):
+    stat = os.stat(path)
+    with open(path) as f:
+        explanations = json.load(f)
+    wanted = parse_slide_ranges(spec, len(explanations))
+    response = jsonify([{'index': index, 'explanation': explanations[index]} for index in sorted(wanted)])
+    # Tied to the result file's version and the requested slides
+    selection = hashlib.sha1(repr(sorted(wanted)).encode('utf-8')).hexdigest()[:12]
+    response.set_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}-{selection}")
+    response.last_modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+    response.cache_control.max_age = RESULT_MAX_AGE_SECONDS
+    return response.make_conditional(request)
 
 
 if __name__ == '__main__':